@@ -1,6 +1,13 @@
 import streamlit as st
 
+from ml_models import WARM_UP, start_background_fits
+
 if __name__ == "__main__":
+    # Start fitting the Interactive ML modeling page's (slow) models now,
+    # so they're ready by the time anyone gets to that page.
+    if WARM_UP:
+        start_background_fits()
+
     st.title("Streamlit Dashboards!")
     st.markdown(
         """
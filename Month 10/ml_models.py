@@ -0,0 +1,104 @@
+"""
+The models and datasets for the Interactive ML modeling page, plus the
+result cache and background fitter that go with them.
+
+These live in their own module (rather than in the page) so that the
+main `Streamlit Demos.py` page can start the background fits too.  That
+way the slow models are already fitting while someone reads the first
+page, instead of only starting once they open the modeling page.
+"""
+import numpy as np
+import streamlit as st
+from sklearn.datasets import make_circles, make_classification, make_moons
+from sklearn.ensemble import AdaBoostClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import ComplementNB, GaussianNB
+from sklearn.neural_network import MLPClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from model_cache import ModelResultCache, dataset_fingerprint, result_key
+from model_fitting import BackgroundFitter
+
+# Fitted results are also saved here, so restarting the server doesn't
+# mean refitting everything.  Set to None to keep results in memory only.
+MODEL_CACHE_DIR = ".model_cache"
+
+# Fit every model to every dataset in a pool of worker processes as soon
+# as anyone opens the app, instead of waiting until someone selects a
+# model.  Set to False to only fit models when they're selected.
+WARM_UP = True
+# How often (in seconds) to refit anything that's dropped out of the
+# cache since then; None to only warm up once.
+WARM_UP_INTERVAL = None
+
+
+def generate_data():
+    """Generate all the datasets to be loaded for explortion.
+    Add more datasets here--the main body of the code below loops
+    over the returned dictionary and automatically populates `st.expander()`
+    sections with the results."""
+    datasets = {}
+    # linearly separable data
+    X, y = make_classification(
+        n_samples=10_000,
+        n_features=2,
+        n_redundant=0,
+        n_informative=2,
+        random_state=1,
+        n_clusters_per_class=1,
+    )
+    rng = np.random.RandomState(2)
+    X += 2 * rng.uniform(size=X.shape)
+    datasets["Linearly Separable"] = train_test_split(X, y, train_size=0.8, random_state=0)
+
+    # circles dataset
+    x, y = make_circles(n_samples=(9000, 1000), noise=0.2, factor=0.5, random_state=0)
+    datasets["Circles"] = train_test_split(x, y, train_size=0.8, random_state=0)
+
+    # moons dataset
+    x, y = make_moons(n_samples=(4000, 1000), noise=0.4, random_state=0)
+    datasets["Moons"] = train_test_split(x, y, train_size=0.8, random_state=0)
+
+    return datasets
+
+
+def make_models():
+    """The models the user can select from."""
+    return {
+        "Decision Tree": DecisionTreeClassifier(random_state=0),
+        "Logistic Regression": LogisticRegression(random_state=0),
+        "Multi Layer Perceptron": MLPClassifier(
+            (256, 256, 256, 256),
+            random_state=0, max_iter=2000),
+        "Gaussian Naive Bayes": GaussianNB(),
+        "Complement Naive Bayes": ComplementNB(),
+        "Adaboost": AdaBoostClassifier(random_state=0),
+        "Histogram Gradient Boosting": HistGradientBoostingClassifier(random_state=0),
+    }
+
+
+@st.cache_resource
+def get_result_cache():
+    """One result cache, shared by every session and every rerun."""
+    return ModelResultCache(cache_dir=MODEL_CACHE_DIR)
+
+
+def model_key(name, clf, data):
+    """Cache key for fitting `clf` to `data`, a train/test split."""
+    return result_key(name, clf, dataset_fingerprint(*data))
+
+
+@st.cache_resource
+def start_background_fits():
+    """Start fitting every model to every dataset in the background.
+    This only ever runs once per server, whichever page calls it first."""
+    datasets = generate_data()
+    jobs = {
+        model_key(name, clf, data): (clf, *data)
+        for name, clf in make_models().items()
+        for data in datasets.values()
+    }
+    fitter = BackgroundFitter(get_result_cache(), jobs, interval=WARM_UP_INTERVAL)
+    fitter.start()
+    return fitter
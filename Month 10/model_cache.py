@@ -0,0 +1,186 @@
+"""
+A small cache for fitted model results, shared by the dashboard pages.
+
+Results are keyed on (model name, model parameters, dataset fingerprint),
+so the key is cheap to compute and doesn't depend on hashing whole
+estimator objects.  The cache is an LRU: once it holds more than
+`max_entries` results, or more than `max_bytes` of them, the least
+recently used results are dropped.
+
+If `cache_dir` is given, every result is also saved there, so fitted
+models survive a server restart.  The folder is an LRU too (by file
+modification time), bounded by `max_disk_entries` and `max_disk_bytes`,
+so it doesn't keep growing as model settings and datasets change.
+Files are written under a temporary name and then renamed, so a crash
+mid-write never leaves a half-written result behind; anything that
+still fails to load is treated as a cache miss and deleted.
+
+Results are stored as plain data (a fitted model, a predictions array,
+PNG bytes), never live Matplotlib figures, so they pickle cleanly.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import joblib
+
+# `grid` is a `BoundaryGrid` of the model's predictions over the plot
+# area.  It defaults to None so that results saved before it was added
+# still load.
+ModelResult = namedtuple(
+    "ModelResult",
+    ["fit_time", "model", "figure_png", "preds", "test_y", "grid"],
+    defaults=[None],
+)
+
+
+def dataset_fingerprint(*arrays):
+    """A short hash of some arrays' shapes, dtypes, and contents."""
+    digest = hashlib.sha256()
+    for array in arrays:
+        digest.update(f"{array.shape}{array.dtype}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def result_key(name, clf, fingerprint):
+    """Cache key for fitting `clf` (called `name`) to a dataset."""
+    params = sorted((k, repr(v)) for k, v in clf.get_params().items())
+    return hashlib.sha256(repr((name, params, fingerprint)).encode()).hexdigest()[:32]
+
+
+class ModelResultCache:
+    """Thread-safe, size- and memory-bounded LRU cache of `ModelResult`s."""
+
+    def __init__(self, max_entries=32, max_bytes=256 * 2**20, cache_dir=None,
+                 max_disk_entries=256, max_disk_bytes=2**30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Enforce the limits on anything left over from earlier runs.
+            self._prune_disk()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.cache_dir is not None and os.path.isfile(self._path(key))
+
+    def get(self, key):
+        """Return the cached result for `key`, or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.cache_dir is not None and os.path.isfile(self._path(key)):
+            try:
+                result = joblib.load(self._path(key))
+                # Mark it as recently used, for _prune_disk().
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                # Pruned by another thread in the meantime.
+                return None
+            except Exception:
+                # Corrupt, or saved by incompatible library versions:
+                # drop it so the result gets refit and saved again.
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+                return None
+            self._insert(key, result)
+            return result
+        return None
+
+    def put(self, key, result):
+        if self.cache_dir is not None:
+            # Write to a unique temporary file, then rename it into place,
+            # so readers only ever see complete files (even if two
+            # sessions save the same key at once).
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            try:
+                joblib.dump(result, tmp_path)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._prune_disk(keep=key)
+        self._insert(key, result)
+
+    def _prune_disk(self, keep=None):
+        """Delete the least recently used files in `cache_dir` until it's
+        within `max_disk_entries` and `max_disk_bytes`.  The file for
+        `keep` (the one just written) is never deleted.  Temporary files
+        more than an hour old (left by a crash mid-write) are deleted too."""
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.endswith(".joblib"):
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith(".tmp") and time.time() - stat.st_mtime > 3600:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+            files.sort()
+            num_files = len(files)
+            total_bytes = sum(size for _, size, _ in files)
+            keep_path = None if keep is None else self._path(keep)
+            for _, size, path in files:
+                if (
+                    num_files <= self.max_disk_entries
+                    and total_bytes <= self.max_disk_bytes
+                ):
+                    break
+                if path == keep_path:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                num_files -= 1
+                total_bytes -= size
+
+    def _insert(self, key, result):
+        size = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+            self._entries[key] = result
+            self._sizes[key] = size
+            self._total_bytes += size
+            # Evict least recently used results, but always keep the newest.
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries
+                or self._total_bytes > self.max_bytes
+            ):
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached result for `key`, calling `compute()` to
+        create (and cache) it if it's not there yet."""
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
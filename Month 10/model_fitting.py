@@ -0,0 +1,188 @@
+"""
+Fitting models for the dashboard, either on demand or in the background.
+
+`fit_model_result()` fits one model to one dataset and renders its plot.
+It lives in its own module, rather than in the dashboard page, so that
+worker processes can import it.
+
+`BackgroundFitter` fits a whole batch of models in a process pool, and
+puts each result into a `ModelResultCache` as soon as it's done, so the
+dashboard can show finished models right away while the slow ones (like
+the big MLP) are still fitting.
+"""
+import concurrent.futures
+import functools
+import io
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MaxAbsScaler
+
+from model_cache import ModelResult
+
+
+# Predicted probabilities on a grid of points covering the data:
+# proba[i, j] is for the point (xs[j], ys[i]).
+BoundaryGrid = namedtuple("BoundaryGrid", ["xs", "ys", "proba"])
+
+
+def boundary_grid(model, x, grid_resolution=100, eps=1.0):
+    """Predict on a `grid_resolution` x `grid_resolution` grid over `x`
+    (plus a margin of `eps`), the same grid `DecisionBoundaryDisplay`
+    would use.  The probabilities are stored as float16--plenty for
+    drawing contours, and a quarter of the size."""
+    xs = np.linspace(x[:, 0].min() - eps, x[:, 0].max() + eps, grid_resolution)
+    ys = np.linspace(x[:, 1].min() - eps, x[:, 1].max() + eps, grid_resolution)
+    xx, yy = np.meshgrid(xs, ys)
+    proba = model.predict_proba(np.column_stack((xx.ravel(), yy.ravel())))[:, 1]
+    return BoundaryGrid(xs, ys, proba.reshape(xx.shape).astype(np.float16))
+
+
+def sample_points(x, y, max_points=2_000, seed=0):
+    """At most `max_points` of the points, picked at random.  A scatter of
+    all 10,000 points mostly draws dots on top of dots anyway."""
+    if len(x) <= max_points:
+        return x, y
+    keep = np.sort(np.random.default_rng(seed).choice(len(x), max_points, replace=False))
+    return x[keep], y[keep]
+
+
+def plot_model(grid, x, y, max_points=2_000):
+    """Render the data and the decision boundary to PNG bytes."""
+    x, y = sample_points(x, y, max_points)
+    fig1, ax = plt.subplots(figsize=(10, 5), ncols=2, sharex=True, sharey=True)
+    ax[0].scatter(x[:, 0], x[:, 1], c=y, cmap="bwr", s=1)
+    ax[1].contourf(grid.xs, grid.ys, grid.proba.astype(np.float32), alpha=0.25, cmap="bwr")
+    ax[0].set_title("Original Data")
+    ax[1].set_title("Decision Boundary")
+
+    # Cache the rendered image, not the live figure.
+    figure_png = io.BytesIO()
+    fig1.savefig(figure_png, format="png")
+    plt.close(fig1)
+    return figure_png.getvalue()
+
+
+def fit_model_result(clf, train_x, test_x, train_y, test_y):
+    """Fit the model, and generate all the stuff that we need to output
+    for the dashboard."""
+    # Fit the model and generate test set predictions.  Fit a copy, so
+    # the same estimator can be fit to each dataset independently.
+    model = Pipeline([("scaler", MaxAbsScaler()), ("clf", clone(clf))])
+    fit_time = time.time()
+    model.fit(train_x, train_y)
+    fit_time = time.time() - fit_time
+
+    # test set predictions
+    preds = model.predict_proba(test_x)[:, 1]
+
+    # Plot of the data + decision boundaries.  The grid is kept with the
+    # result, so redrawing the plot never needs to predict again.
+    x = np.vstack((train_x, test_x))
+    y = np.concatenate((train_y, test_y))
+    grid = boundary_grid(model, x)
+    figure_png = plot_model(grid, x, y)
+
+    return ModelResult(fit_time, model, figure_png, preds, test_y, grid)
+
+
+class BackgroundFitter:
+    """
+    Fit a batch of models in worker processes, streaming the results
+    into `cache` as they finish.
+
+    `jobs` maps cache keys to `(clf, train_x, test_x, train_y, test_y)`
+    tuples.  `start()` submits every job whose result isn't cached yet;
+    with `interval` (in seconds) set, it keeps doing that on a timer, so
+    anything evicted from the cache (or that failed) gets refit.
+    """
+
+    def __init__(self, cache, jobs, num_workers=None, interval=None):
+        self.cache = cache
+        self.jobs = dict(jobs)
+        self.num_workers = num_workers
+        self.interval = interval
+        self._futures = {}
+        # Keys of jobs whose last attempt raised an error.
+        self._failed = set()
+        self._executor = None
+        self._timer = None
+        # Re-entrant: a done callback can run straight away, inside submit().
+        self._lock = threading.RLock()
+
+    def start(self):
+        """Submit every job that isn't already cached or running."""
+        with self._lock:
+            todo = [k for k in self.jobs if k not in self._futures and k not in self.cache]
+            if todo and self._executor is None:
+                # "spawn" rather than forking a server full of threads.
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    self.num_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            for key in todo:
+                self._failed.discard(key)
+                future = self._executor.submit(fit_model_result, *self.jobs[key])
+                self._futures[key] = future
+                future.add_done_callback(functools.partial(self._finished, key))
+            if self.interval is not None and self._timer is None:
+                self._schedule()
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.interval, self._tick)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _tick(self):
+        self._timer = None
+        self.start()
+
+    def _finished(self, key, future):
+        # Cache the result *before* forgetting the future, so a job is
+        # always either running or (if it worked) cached.
+        succeeded = not future.cancelled() and future.exception() is None
+        if succeeded:
+            self.cache.put(key, future.result())
+        with self._lock:
+            del self._futures[key]
+            if not succeeded:
+                self._failed.add(key)
+            if not self._futures and self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def progress(self):
+        """`(finished, failed, total)` number of jobs.  Failed jobs don't
+        count as finished."""
+        with self._lock:
+            failed = len(self._failed)
+            return len(self.jobs) - len(self._futures) - failed, failed, len(self.jobs)
+
+    def as_completed(self, keys):
+        """Yield `keys`: the finished ones first, then the rest as each
+        one finishes."""
+        with self._lock:
+            pending = {self._futures[k]: k for k in keys if k in self._futures}
+        running = set(pending.values())
+        yield from (k for k in keys if k not in running)
+        for future in concurrent.futures.as_completed(pending):
+            yield pending[future]
+
+    def result(self, key, compute):
+        """The result for `key`: waiting for it if it's being fit in the
+        background, or calling `compute()` if it's not there at all."""
+        with self._lock:
+            future = self._futures.get(key)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                # Fit it in the foreground instead, so any error shows up
+                # on the page.
+                pass
+        return self.cache.get_or_compute(key, compute)
@@ -2,57 +2,25 @@
 A dashboard for interactively querying a pre-trained ML model.
 This can be a useful way to explore or demo a model.
 """
-import time
 
-import matplotlib as mpl
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
 import streamlit as st
 from sklearn import metrics
-from sklearn.datasets import make_circles, make_classification, make_moons
-from sklearn.ensemble import AdaBoostClassifier, HistGradientBoostingClassifier
-from sklearn.inspection import DecisionBoundaryDisplay
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.naive_bayes import ComplementNB, GaussianNB
-from sklearn.neural_network import MLPClassifier
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import MaxAbsScaler
-from sklearn.tree import DecisionTreeClassifier
 
-# st.set_page_config(layout="wide")
-
-
-def generate_data():
-    """Generate all the datasets to be loaded for explortion.
-    Add more datasets here--the main body of the code below loops
-    over the returned dictionary and automatically populates `st.expander()`
-    sections with the results."""
-    datasets = {}
-    # linearly separable data
-    X, y = make_classification(
-        n_samples=10_000,
-        n_features=2,
-        n_redundant=0,
-        n_informative=2,
-        random_state=1,
-        n_clusters_per_class=1,
-    )
-    rng = np.random.RandomState(2)
-    X += 2 * rng.uniform(size=X.shape)
-    datasets["Linearly Separable"] = train_test_split(X, y, train_size=0.8, random_state=0)
-
-    # circles dataset
-    x, y = make_circles(n_samples=(9000, 1000), noise=0.2, factor=0.5, random_state=0)
-    datasets["Circles"] = train_test_split(x, y, train_size=0.8, random_state=0)
-
-    # moons dataset
-    x, y = make_moons(n_samples=(4000, 1000), noise=0.4, random_state=0)
-    datasets["Moons"] = train_test_split(x, y, train_size=0.8, random_state=0)
+from ml_models import (
+    WARM_UP,
+    generate_data,
+    get_result_cache,
+    make_models,
+    model_key,
+    start_background_fits,
+)
+from model_fitting import fit_model_result
 
-    return datasets
+# st.set_page_config(layout="wide")
 
 
 def plot_cutoff_results(y_true, pred, cutoff):
@@ -65,24 +33,56 @@ def plot_cutoff_results(y_true, pred, cutoff):
     return fig
 
 
-def accuracies(true, preds, cutoff=0.5):
-    """Return a DataFrame for the confusion matrix, based on the cutoff
-    provided for the predictions."""
+class CutoffMetrics:
+    """Accuracy metrics for a set of predictions, at any cutoff.
+
+    The predictions get sorted once, along with a running count of how
+    many of them are actually positive.  Then for any cutoff, one binary
+    search finds how many predictions fall below it, and the confusion
+    matrix falls out of the running counts--no pass over the data."""
+
+    def __init__(self, true, preds):
+        true = np.asarray(true).astype(bool)
+        order = np.argsort(preds, kind="stable")
+        self.sorted_preds = preds[order]
+        # positives_below[i]: how many of the i lowest predictions are positive.
+        self.positives_below = np.concatenate(([0], np.cumsum(true[order])))
+        self.num_positive = int(self.positives_below[-1])
+
+        # These don't depend on the cutoff, so only compute them once.
+        self.auc_roc = metrics.roc_auc_score(true, preds)
+        self.log_loss = metrics.log_loss(true, preds)
+        self.brier_score = metrics.brier_score_loss(true, preds)
+
+    def confusion(self, cutoff):
+        """(true_pos, false_neg, false_pos, true_neg), predicting positive
+        when the prediction is >= cutoff."""
+        below = int(np.searchsorted(self.sorted_preds, cutoff, side="left"))
+        false_neg = int(self.positives_below[below])
+        true_neg = below - false_neg
+        true_pos = self.num_positive - false_neg
+        false_pos = len(self.sorted_preds) - below - true_pos
+        return true_pos, false_neg, false_pos, true_neg
+
+
+def accuracies(scores, cutoff=0.5):
+    """Return a DataFrame of accuracy metrics and one for the confusion
+    matrix, based on the cutoff provided for the predictions.  `scores`
+    is a `CutoffMetrics` for the predictions."""
+    true_pos, false_neg, false_pos, true_neg = scores.confusion(cutoff)
+    total = true_pos + false_neg + false_pos + true_neg
+    f1_denominator = 2 * true_pos + false_pos + false_neg
     accuracies = pd.DataFrame(
         [
-            {"Metric": "Accuracy", "Score": metrics.accuracy_score(test_y, preds >= cutoff)},
-            {"Metric": "F1", "Score": metrics.f1_score(test_y, preds >= cutoff)},
-            {"Metric": "AUC-ROC", "Score": metrics.roc_auc_score(test_y, preds)},
-            {"Metric": "Log Loss", "Score": metrics.log_loss(test_y, preds)},
-            {"Metric": "Brier Score", "Score": metrics.brier_score_loss(test_y, preds)},
+            {"Metric": "Accuracy", "Score": (true_pos + true_neg) / total},
+            {"Metric": "F1", "Score": 2 * true_pos / f1_denominator if f1_denominator else 0.0},
+            {"Metric": "AUC-ROC", "Score": scores.auc_roc},
+            {"Metric": "Log Loss", "Score": scores.log_loss},
+            {"Metric": "Brier Score", "Score": scores.brier_score},
         ]
     )
 
     # Manually generate a confusion matrix with better column/index names.
-    true_pos = sum((preds == 1) & (true == 1))
-    true_neg = sum((preds == 0) & (true == 0))
-    false_pos = sum((preds == 0) & (true == 1))
-    false_neg = sum((preds == 1) & (true == 0))
     cm = pd.DataFrame(
         [[true_pos, false_neg], [false_pos, true_neg]],
         columns=pd.MultiIndex.from_tuples(
@@ -101,57 +101,29 @@ def accuracies(true, preds, cutoff=0.5):
     return accuracies, cm
 
 
-# WHen caching any matplotlib figures, Streamlit will normally hang.
-# This little fix (borrowed from someone on the Strealit forums)
-# specifies a custom hash function for Matplotlib figures
-# which seems to work.
-@st.cache(hash_funcs={mpl.figure.Figure: lambda _: None})
-def generate_model_result(clf, train_x, test_x, train_y, test_y):
-    """Fit the model, and generate all the stuff that we need to output
-    for the dashboard."""
-    # Fit the model and generate test set predictions
-    model = Pipeline([("scaler", MaxAbsScaler()), ("clf", clf)])
-    fit_time = time.time()
-    model.fit(train_x, train_y)
-    fit_time = time.time() - fit_time
-
-    # test set predictions
-    preds = model.predict_proba(test_x)[:, 1]
-
-    # Plot of the data + decision boundaries
-    x = np.vstack((train_x, test_x))
-    y = np.concatenate((train_y, test_y))
-    fig1, ax = plt.subplots(figsize=(10, 5), ncols=2, sharex=True, sharey=True)
-    ax[0].scatter(x[:, 0], x[:, 1], c=y, cmap="bwr", s=1)
-    DecisionBoundaryDisplay.from_estimator(
-        model,
-        x,
-        grid_resolution=100,
-        ax=ax[1],
-        alpha=0.25,
-        cmap="bwr",
-    )
-    ax[0].set_title("Original Data")
-    ax[1].set_title("Decision Boundary")
+@st.cache_resource
+def cutoff_metrics(key, _true, _preds):
+    """`CutoffMetrics` for one model/dataset's predictions, built once per
+    cache `key` rather than on every slider move."""
+    return CutoffMetrics(_true, _preds)
+
 
-    return fit_time, fig1, preds, test_y
+def generate_model_result(name, clf, data, fitter=None):
+    """Look up the result of fitting `clf` to this dataset.  If it's
+    being fit in the background, wait for that; if it's not cached at
+    all, fit it now."""
+    key = model_key(name, clf, data)
+    compute = lambda: fit_model_result(clf, *data)
+    if fitter is not None:
+        return fitter.result(key, compute)
+    return get_result_cache().get_or_compute(key, compute)
 
 
 if __name__ == "__main__":
     datasets = generate_data()
 
     # Let the user select the model to fit.
-    models = {
-        "Decision Tree": DecisionTreeClassifier(random_state=0),
-        "Logistic Regression": LogisticRegression(random_state=0),
-        "Multi Layer Perceptron": MLPClassifier(
-            (256, 256, 256, 256),
-            random_state=0, max_iter=2000),
-        "Gaussian Naive Bayes": GaussianNB(),
-        "Complement Naive Bayes": ComplementNB(),
-        "Adaboost": AdaBoostClassifier(random_state=0),
-        "Histogram Gradient Boosting": HistGradientBoostingClassifier(random_state=0),
-    }
+    models = make_models()
 
     st.title("Comparison of different scikit-learn models")
     st.markdown(
@@ -180,16 +152,49 @@ if __name__ == "__main__":
         """
     )
 
+    # Usually already started by the main page.
+    fitter = start_background_fits() if WARM_UP else None
+    if fitter is not None:
+        progress_bar = st.progress(0.0)
+        progress_text = st.empty()
+
+    def show_progress():
+        if fitter is None:
+            return
+        finished, failed, total = fitter.progress()
+        progress_bar.progress(finished / total)
+        message = f"Background model fitting: {finished}/{total} done"
+        if failed:
+            message += f", {failed} failed (they'll be fit when selected)"
+        progress_text.caption(message)
+
+    show_progress()
     model_selector = st.selectbox(
         "Select a model to fit and investigate.",
         models.keys(),
     )
     model = models[model_selector]
+
+    # Lay out all the expanders up front, then fill in each one as its
+    # model finishes fitting, so finished results show up right away.
+    expanders = {}
+    waiting = {}
     for dataset in datasets.keys():
-        with st.expander(dataset):
-            # fit_time, data, preds, test_y = generate_model_result(model, *generate_data())
-            fit_time, data, preds, test_y = generate_model_result(model, *datasets[dataset])
-            st.pyplot(data)
+        expanders[dataset] = st.expander(dataset)
+        waiting[dataset] = expanders[dataset].empty()
+        waiting[dataset].info("Fitting model...")
+    keys = {model_key(model_selector, model, datasets[dataset]): dataset for dataset in datasets}
+    order = fitter.as_completed(list(keys)) if fitter is not None else list(keys)
+
+    for key in order:
+        dataset = keys[key]
+        with expanders[dataset]:
+            fit_time, _, figure_png, preds, test_y, _ = generate_model_result(
+                model_selector, model, datasets[dataset], fitter
+            )
+            waiting[dataset].empty()
+            show_progress()
+            st.image(figure_png)
             cutoff_plot = st.empty()
 
             st.write(f"Fit time: {fit_time:.3f}s")
@@ -204,7 +209,7 @@ if __name__ == "__main__":
                 key=dataset,
             )
             cutoff_plot.pyplot(plot_cutoff_results(test_y, preds, cutoff_value))
-            acc, cm = accuracies(test_y, preds, cutoff_value)
+            acc, cm = accuracies(cutoff_metrics(key, test_y, preds), cutoff_value)
             c1, c2 = st.columns(2)
             with c1:
                 st.write("Accuracy Metrics")
@@ -18,11 +18,12 @@ Logic:
     )
 
 """
+import multiprocessing
+import os
+import time
+from array import array
 from copy import deepcopy
 
-instructions = list(map(int, open("inputs/2019_day_2").read().split(",")))
-instructions[1] = 12
-instructions[2] = 2
 
 def compute_intcode(instructions):
     instructions = deepcopy(instructions)
@@ -41,13 +42,151 @@ def compute_intcode(instructions):
     return instructions[0]
 
 
-# desired output: 19690720
-for noun in range(100):
-    for verb in range(100):
-        # print(noun, verb)
-        instructions[1] = noun
-        instructions[2] = verb
-        result = compute_intcode(instructions)
-        if result == 19690720:
-            print(100*noun + verb)
-            exit()
\ No newline at end of file
+class IntcodeVM:
+    """
+    A reusable intcode machine.
+
+    The program gets decoded once, up front, into a list of
+    (opcode, operand_1, operand_2, destination) tuples--one per
+    instruction--so running it doesn't need to re-slice memory at
+    every step.  Memory is an `array("q")`, so resetting it between
+    runs is a single flat copy rather than a `deepcopy()`.
+
+    Intcode programs can overwrite their own instructions, so any write
+    into memory re-decodes the instruction it landed in.
+    """
+
+    def __init__(self, program):
+        self.program = array("q", program)
+        self._decoded = self._decode(self.program)
+        self.steps = 0
+        self.reset()
+
+    @staticmethod
+    def _decode_one(memory, idx):
+        # A halt at the very end of memory may not have 3 operands after it.
+        instruction = tuple(memory[idx:idx+4])
+        return instruction + (0,) * (4 - len(instruction))
+
+    def _decode(self, memory):
+        return [self._decode_one(memory, idx) for idx in range(0, len(memory), 4)]
+
+    def reset(self, noun=None, verb=None):
+        """Restore memory to the original program, optionally patching
+        in a noun (address 1) and verb (address 2)."""
+        self.memory = self.program[:]
+        self._code = self._decoded[:]
+        if noun is not None:
+            self.memory[1] = noun
+        if verb is not None:
+            self.memory[2] = verb
+        if noun is not None or verb is not None:
+            self._code[0] = self._decode_one(self.memory, 0)
+
+    def run(self, noun=None, verb=None):
+        """Reset, run until the program halts, and return address 0."""
+        self.reset(noun, verb)
+        memory = self.memory
+        code = self._code
+        decode = self._decode_one
+        steps = 0
+        for ip in range(len(code)):
+            opcode, operand_1, operand_2, destination = code[ip]
+            steps += 1
+            if opcode == 1:
+                memory[destination] = memory[operand_1] + memory[operand_2]
+            elif opcode == 2:
+                memory[destination] = memory[operand_1] * memory[operand_2]
+            elif opcode == 99:
+                break
+            else:
+                raise ValueError(f"Bad opcode: {opcode}")
+            code[destination >> 2] = decode(memory, destination & ~3)
+        self.steps += steps
+        return memory[0]
+
+
+# Each worker process gets its own VM (built once, in the pool initializer)
+# plus a shared flag that's set as soon as anyone finds the answer.
+_VM = None
+_FOUND = None
+
+
+def _init_search_worker(program, found):
+    global _VM, _FOUND
+    _VM = IntcodeVM(program)
+    _FOUND = found
+
+
+def _search_noun(noun, target, verbs):
+    if _FOUND.is_set():
+        return None
+    for verb in verbs:
+        if _VM.run(noun, verb) == target:
+            _FOUND.set()
+            return noun, verb
+    return None
+
+
+def _search_noun_star(args):
+    return _search_noun(*args)
+
+
+def find_noun_verb(program, target, nouns=range(100), verbs=range(100), num_workers=None):
+    """
+    Find a (noun, verb) pair that makes `program` output `target`.
+
+    Each noun is its own task, and each task tries every verb.  Tasks
+    are spread over a process pool (`os.cpu_count()` workers by default);
+    once any worker finds a match, the rest skip their remaining tasks and
+    the pool is shut down.  Returns None if no pair works.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    verbs = list(verbs)
+    found = multiprocessing.Event()
+    with multiprocessing.Pool(
+        num_workers,
+        initializer=_init_search_worker,
+        initargs=(list(program), found),
+    ) as P:
+        tasks = ((noun, target, verbs) for noun in nouns)
+        for result in P.imap_unordered(_search_noun_star, tasks):
+            if result is not None:
+                # Leaving the `with` block terminates the pool.
+                return result
+    return None
+
+
+def benchmark(program, runs=2_000):
+    """Compare steps/second of `compute_intcode()` and `IntcodeVM`."""
+    vm = IntcodeVM(program)
+    vm.run(12, 2)
+    steps_per_run = vm.steps
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        compute_intcode(program)
+    naive = runs * steps_per_run / (time.perf_counter() - start)
+
+    vm.steps = 0
+    start = time.perf_counter()
+    for _ in range(runs):
+        vm.run(12, 2)
+    fast = vm.steps / (time.perf_counter() - start)
+
+    print(f"compute_intcode(): {naive:,.0f} steps/s")
+    print(f"IntcodeVM.run():   {fast:,.0f} steps/s ({fast / naive:.1f}x)")
+
+
+if __name__ == "__main__":
+    instructions = list(map(int, open("inputs/2019_day_2").read().split(",")))
+    instructions[1] = 12
+    instructions[2] = 2
+    print(compute_intcode(instructions))
+    print(IntcodeVM(instructions).run())
+
+    # desired output: 19690720
+    noun, verb = find_noun_verb(instructions, 19690720)
+    print(100*noun + verb)
+
+    benchmark(instructions)
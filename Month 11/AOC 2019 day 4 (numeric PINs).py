@@ -5,4 +5,106 @@ How many 6-digit pins meet the following criteria:
     - Contains two adjacent, identical values.  E.g.: *11*2345, 12*33*45
     - The digits never decrease going from left to right.
     - Are between 108457 and 562041
+
+Checking every number in the range works for 6 digits, but almost all of
+them fail the never-decreasing rule.  There are only C(n + 9, 9)
+never-decreasing n-digit sequences (5,005 for n = 6), and we can even
+count them without listing them:
+    - after placing digit d, the never-decreasing suffixes of length L
+      (using digits >= d) are multisets of size L from (10 - d) digits:
+      C(L + 9 - d, L).
+    - the ones that don't repeat anything, d included, are strictly
+      increasing suffixes from the digits > d, i.e. subsets of size L
+      from (9 - d) digits: C(9 - d, L).  (In a never-decreasing
+      sequence, any repeated digit must be repeated adjacently.)
+So counting up to some bound is a digit-by-digit walk along the bound,
+adding up those binomials for every smaller digit we could have used.
+
+Numbers shorter than n digits are treated as being padded with leading
+zeros, e.g. with n = 6, 1234 is 001234 and counts as having a pair.
 """
+import itertools
+import time
+from math import comb
+
+
+def is_valid(digits):
+    """The naive check, on a string of digits."""
+    has_pair = False
+    for a, b in zip(digits, digits[1:]):
+        if b < a:
+            return False
+        if a == b:
+            has_pair = True
+    return has_pair
+
+
+def count_naive(low, high, n_digits=6):
+    return sum(is_valid(f"{pin:0{n_digits}d}") for pin in range(low, high + 1))
+
+
+def iter_valid(low, high, n_digits=6):
+    """
+    Yield every valid PIN in [low, high], in increasing order, generating
+    only never-decreasing digit sequences in the first place.
+    """
+    # combinations_with_replacement() gives exactly the never-decreasing
+    # sequences, already in sorted order.
+    for digits in itertools.combinations_with_replacement(range(10), n_digits):
+        pin = int("".join(map(str, digits)))
+        if pin > high:
+            return
+        if pin >= low and len(set(digits)) < n_digits:
+            yield pin
+
+
+def count_up_to(bound, n_digits=6):
+    """Number of valid n-digit PINs in [0, bound]."""
+    if bound < 0:
+        return 0
+    if bound >= 10**n_digits:
+        bound = 10**n_digits - 1
+    digits = list(map(int, f"{bound:0{n_digits}d}"))
+
+    count = 0
+    previous = 0
+    has_pair = False
+    for i, bound_digit in enumerate(digits):
+        remaining = n_digits - i - 1
+        for d in range(previous, bound_digit):
+            all_suffixes = comb(remaining + 9 - d, remaining)
+            if has_pair or (i > 0 and d == previous):
+                count += all_suffixes
+            else:
+                # The suffix has to supply the pair: don't count the
+                # strictly increasing suffixes (digits all above d).
+                count += all_suffixes - comb(9 - d, remaining)
+        if bound_digit < previous:
+            # Nothing else sharing this prefix can be never-decreasing.
+            return count
+        if i > 0 and bound_digit == previous:
+            has_pair = True
+        previous = bound_digit
+    # Finally, the bound itself.
+    return count + has_pair
+
+
+def count_valid(low, high, n_digits=6):
+    """Number of valid n-digit PINs in [low, high]."""
+    return count_up_to(high, n_digits) - count_up_to(low - 1, n_digits)
+
+
+if __name__ == "__main__":
+    low, high = 108457, 562041
+    print(count_naive(low, high))
+    print(sum(1 for _ in iter_valid(low, high)))
+    print(count_valid(low, high))
+
+    for func in (count_naive, count_valid):
+        start = time.perf_counter()
+        func(low, high)
+        print(f"6 digits, {func.__name__}: {time.perf_counter() - start:.6f}s")
+
+    low, high = 108457_000000_000000, 562041_999999_999999
+    start = time.perf_counter()
+    print(count_valid(low, high, n_digits=18), f"{time.perf_counter() - start:.6f}s")
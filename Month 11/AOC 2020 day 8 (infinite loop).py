@@ -10,4 +10,171 @@ Instructions:
     acc N - increment or decrement the global accumulator by N
     jmp N - move to the instruction N lines above/below and resume execution
 
+Part 2: exactly one jmp should be a nop, or one nop should be a jmp.
+The fixed program terminates by trying to run the instruction just past
+the end of the program.  What's the accumulator when it does?
+
+The obvious approach to part 2 flips each jmp/nop in turn and re-runs
+the program, which is O(n^2).  Instead, we work out once which
+instructions lead to termination, by walking the control flow graph
+backwards from the end of the program.  The fix is then the first
+instruction on the original (looping) path whose flipped version jumps
+to one of those.
 """
+import random
+import time
+from array import array
+
+NOP, ACC, JMP = 0, 1, 2
+OPCODES = {"nop": NOP, "acc": ACC, "jmp": JMP}
+
+
+def decode(lines):
+    """Decode the program into parallel opcode and operand arrays."""
+    opcodes = array("B")
+    operands = array("q")
+    for line in lines:
+        op, arg = line.split()
+        opcodes.append(OPCODES[op])
+        operands.append(int(arg))
+    return opcodes, operands
+
+
+def run(opcodes, operands, flip=-1):
+    """
+    Run the program until it either repeats an instruction or runs off
+    the end.  If `flip` is given, that instruction's jmp/nop is swapped.
+
+    Returns `(terminated, accumulator)`.
+    """
+    n = len(opcodes)
+    visited = bytearray(n)
+    acc = 0
+    pc = 0
+    while 0 <= pc < n and not visited[pc]:
+        visited[pc] = 1
+        op = opcodes[pc]
+        if pc == flip and op != ACC:
+            op = NOP if op == JMP else JMP
+        if op == ACC:
+            acc += operands[pc]
+            pc += 1
+        elif op == JMP:
+            pc += operands[pc]
+        else:
+            pc += 1
+    return pc == n, acc
+
+
+def successors(opcodes, operands, flipped=False):
+    """Where each instruction goes next (with jmp/nop swapped if `flipped`)."""
+    nexts = array("q", range(1, len(opcodes) + 1))
+    jump = NOP if flipped else JMP
+    for pc, op in enumerate(opcodes):
+        if op == jump:
+            nexts[pc] = pc + operands[pc]
+    return nexts
+
+
+def reaches_end(opcodes, operands):
+    """
+    For every instruction, whether starting there makes the (unmodified)
+    program terminate.
+
+    This is a breadth-first search *backwards* from the end of the
+    program (instruction n).  The predecessor lists are stored CSR-style:
+    instruction i's predecessors are `preds[starts[i]:starts[i + 1]]`.
+    """
+    n = len(opcodes)
+    nexts = successors(opcodes, operands)
+
+    starts = array("q", [0]) * (n + 2)
+    for target in nexts:
+        if 0 <= target <= n:
+            starts[target + 1] += 1
+    for i in range(n + 1):
+        starts[i + 1] += starts[i]
+    fill = starts[:]
+    preds = array("q", [0]) * starts[n + 1]
+    for pc, target in enumerate(nexts):
+        if 0 <= target <= n:
+            preds[fill[target]] = pc
+            fill[target] += 1
+
+    terminates = bytearray(n + 1)
+    terminates[n] = 1
+    queue = [n]
+    for target in queue:
+        for pc in preds[starts[target]:starts[target + 1]]:
+            if not terminates[pc]:
+                terminates[pc] = 1
+                queue.append(pc)
+    return terminates
+
+
+def repair(opcodes, operands):
+    """
+    Find the one jmp/nop that needs flipping.  O(n) overall.
+
+    Returns `(index of the flipped instruction, final accumulator)`, or
+    None if no single flip works.
+    """
+    n = len(opcodes)
+    terminates = reaches_end(opcodes, operands)
+    flipped_nexts = successors(opcodes, operands, flipped=True)
+    visited = bytearray(n)
+    pc = 0
+    while 0 <= pc < n and not visited[pc]:
+        visited[pc] = 1
+        op = opcodes[pc]
+        if op != ACC and 0 <= flipped_nexts[pc] <= n and terminates[flipped_nexts[pc]]:
+            return pc, run(opcodes, operands, flip=pc)[1]
+        pc += operands[pc] if op == JMP else 1
+    return None
+
+
+def repair_brute_force(opcodes, operands):
+    """Flip every jmp/nop in turn and re-run.  O(n^2)."""
+    for pc, op in enumerate(opcodes):
+        if op != ACC:
+            terminated, acc = run(opcodes, operands, flip=pc)
+            if terminated:
+                return pc, acc
+    return None
+
+
+def random_program(n, seed=0):
+    """
+    A long program with exactly one fix: a backwards jmp near the end
+    that should be a nop.  Lots of other nops would jump backwards
+    (into a loop) if flipped, so brute force has plenty to try.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for pc in range(n):
+        if pc == n - 10:
+            lines.append("jmp -5")
+        elif pc % 10 == 5:
+            lines.append(f"nop -{rng.randint(1, pc)}")
+        elif pc % 10 == 7:
+            lines.append("jmp +2")
+        else:
+            lines.append(f"acc {rng.randint(-50, 50):+d}")
+    return lines
+
+
+if __name__ == "__main__":
+    opcodes, operands = decode(open("inputs/2020_day_8"))
+    print(run(opcodes, operands)[1])
+    print(repair(opcodes, operands))
+    print(repair_brute_force(opcodes, operands))
+
+    for n, brute_force in ((10_000, True), (2_000_000, False)):
+        opcodes, operands = decode(random_program(n))
+        start = time.perf_counter()
+        result = repair(opcodes, operands)
+        print(f"{n:,} instructions, repair(): {result} in {time.perf_counter() - start:.2f}s")
+        if brute_force:
+            start = time.perf_counter()
+            result = repair_brute_force(opcodes, operands)
+            print(f"{n:,} instructions, brute force: {result} in {time.perf_counter() - start:.2f}s")
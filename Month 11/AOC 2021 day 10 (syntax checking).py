@@ -18,3 +18,110 @@ first one on a line counts.
 
 What is the sum of the error scores for each line in the input file?
 """
+import multiprocessing
+import os
+import tempfile
+import time
+
+# Lookup tables indexed by byte value, so checking a character is a single
+# index operation rather than a dict lookup or a chain of ifs.
+#   CLOSER[b]: the closing bracket that matches opening bracket b (else 0)
+#   SCORE[b]:  the points for an unexpected closing bracket b (else 0)
+CLOSER = bytearray(256)
+SCORE = [0] * 256
+for opener, closer, points in zip(b"([{<", b")]}>", (3, 57, 1197, 25137)):
+    CLOSER[opener] = closer
+    SCORE[closer] = points
+
+
+def line_error_score(line, stack):
+    """
+    Score of the first illegal closing bracket in `line` (0 if none).
+
+    `stack` is a preallocated bytearray of expected closing brackets; it
+    gets reused from line to line, and grown if a line nests deeper than
+    it can hold.
+    """
+    depth = 0
+    for char in line:
+        closer = CLOSER[char]
+        if closer:
+            if depth == len(stack):
+                stack.extend(bytes(len(stack) or 64))
+            stack[depth] = closer
+            depth += 1
+        elif SCORE[char]:
+            if depth and stack[depth - 1] == char:
+                depth -= 1
+            else:
+                return SCORE[char]
+    return 0
+
+
+def _score_byte_range(path, start, end):
+    """
+    Total score of every line that *starts* in the byte range
+    [start, end) of the file.
+    """
+    stack = bytearray(4096)
+    total = 0
+    with open(path, "rb") as f:
+        if start:
+            # Back up one byte and skip to the end of that line: if we
+            # landed mid-line, that line belongs to the previous range.
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            total += line_error_score(line, stack)
+    return total
+
+
+def syntax_error_score(path):
+    """Stream the file a line at a time and total up the error scores."""
+    return _score_byte_range(path, 0, os.path.getsize(path))
+
+
+def _score_byte_range_star(args):
+    return _score_byte_range(*args)
+
+
+def syntax_error_score_parallel(path, num_workers=None, chunk_size=None):
+    """
+    Same as `syntax_error_score()`, but the file is split into byte
+    ranges of about `chunk_size` bytes, and each worker process opens
+    the file and scores its own range.  Only the file name and the
+    range's offsets get sent to the workers.
+
+    By default, there are about 4 ranges per worker (so a slow range
+    doesn't hold everyone up), but none smaller than 64 KiB.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    if chunk_size is None:
+        chunk_size = max(size // (4 * num_workers), 1 << 16)
+    ranges = [
+        (path, start, min(start + chunk_size, size))
+        for start in range(0, size, chunk_size)
+    ]
+    with multiprocessing.Pool(num_workers) as P:
+        return sum(P.imap_unordered(_score_byte_range_star, ranges))
+
+
+if __name__ == "__main__":
+    print(syntax_error_score("inputs/2021_day_10"))
+    print(syntax_error_score_parallel("inputs/2021_day_10", chunk_size=1_000))
+
+    # Benchmark on a larger file made of copies of the input.
+    handle, big_file = tempfile.mkstemp()
+    with os.fdopen(handle, "wb") as f:
+        data = open("inputs/2021_day_10", "rb").read()
+        for _ in range(2_000):
+            f.write(data)
+    for func in (syntax_error_score, syntax_error_score_parallel):
+        start = time.perf_counter()
+        score = func(big_file)
+        print(f"{func.__name__}: {score} in {time.perf_counter() - start:.2f}s")
+    os.remove(big_file)
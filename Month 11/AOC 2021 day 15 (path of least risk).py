@@ -1,3 +1,112 @@
 """
 https://adventofcode.com/2021/day/15
+
+The input is a grid of single-digit "risk levels."  Starting in the top
+left corner and moving up/down/left/right, what's the lowest total risk
+of any path to the bottom right corner?  (The starting square's risk
+doesn't count.)
+
+Part 2: the real map is the input tiled 5x5 times.  Each tile to the
+right or down adds 1 to every risk level, wrapping from 9 back to 1.
+
+This is a shortest-path problem: Dijkstra's algorithm, or A* with the
+Manhattan distance to the corner as the heuristic (every step costs at
+least 1, so it never overestimates).  A few things keep it fast on big
+grids:
+    - The grid is a flat array of bytes, and nodes are plain integer
+      indices into it (row * width + column), not (row, col) tuples.
+    - Heap entries are single ints too: the priority is packed into the
+      high bits and the node id into the low bits.
+    - The tiled map is never built.  A node's risk is looked up in the
+      original tile and adjusted on the fly.
 """
+import heapq
+import time
+
+import numpy as np
+
+
+def load_grid(path):
+    """Read the digits into a 2D uint8 array."""
+    raw = np.frombuffer(open(path, "rb").read(), dtype=np.uint8)
+    raw = raw[(raw >= ord("0")) & (raw <= ord("9"))]
+    width = len(open(path).readline().strip())
+    return (raw - ord("0")).reshape(-1, width)
+
+
+def lowest_total_risk(grid, tiles=1, astar=False):
+    """
+    Lowest total risk from the top left to the bottom right corner of
+    `grid` repeated `tiles` x `tiles` times.  With `astar=True`, use A*
+    instead of plain Dijkstra.
+    """
+    tile_height, tile_width = grid.shape
+    height, width = tile_height * tiles, tile_width * tiles
+    goal = height * width - 1
+    # Plain bytes are much faster to index one element at a time than a
+    # numpy array is, and it's the same flat uint8 layout.
+    risks = np.ascontiguousarray(grid, dtype=np.uint8).ravel().tobytes()
+
+    node_bits = goal.bit_length()
+    node_mask = (1 << node_bits) - 1
+    best = [-1] * (goal + 1)
+    best[0] = 0
+    done = bytearray(goal + 1)
+    heap = [0]
+    while heap:
+        node = heapq.heappop(heap) & node_mask
+        if done[node]:
+            continue
+        if node == goal:
+            return best[node]
+        done[node] = 1
+
+        cost = best[node]
+        row, col = divmod(node, width)
+        for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if not (0 <= r < height and 0 <= c < width):
+                continue
+            neighbor = r * width + c
+            if done[neighbor]:
+                continue
+            tile_row, tile_r = divmod(r, tile_height)
+            tile_col, tile_c = divmod(c, tile_width)
+            risk = (risks[tile_r * tile_width + tile_c] + tile_row + tile_col - 1) % 9 + 1
+            new_cost = cost + risk
+            if best[neighbor] < 0 or new_cost < best[neighbor]:
+                best[neighbor] = new_cost
+                priority = new_cost
+                if astar:
+                    priority += (height - 1 - r) + (width - 1 - c)
+                heapq.heappush(heap, (priority << node_bits) | neighbor)
+    return None
+
+
+def tile(grid, tiles):
+    """Actually build the tiled map.  Only used to check the lazy version."""
+    rows = []
+    for tile_row in range(tiles):
+        rows.append(np.hstack([
+            (grid + tile_row + tile_col - 1) % 9 + 1
+            for tile_col in range(tiles)
+        ]))
+    return np.vstack(rows).astype(np.uint8)
+
+
+if __name__ == "__main__":
+    grid = load_grid("inputs/2021_day_15")
+    print(lowest_total_risk(grid), lowest_total_risk(grid, astar=True))
+    print(lowest_total_risk(grid, tiles=5), lowest_total_risk(grid, tiles=5, astar=True))
+    print(lowest_total_risk(tile(grid, 5)))
+
+    rng = np.random.default_rng(0)
+    for size in (50, 100, 200):
+        random_grid = rng.integers(1, 10, size=(size, size), dtype=np.uint8)
+        for tiles in (1, 5):
+            for astar in (False, True):
+                start = time.perf_counter()
+                lowest_total_risk(random_grid, tiles, astar)
+                print(
+                    f"{size}x{size} grid, {tiles}x{tiles} tiles, "
+                    f"{'A*' if astar else 'Dijkstra'}: {time.perf_counter() - start:.2f}s"
+                )
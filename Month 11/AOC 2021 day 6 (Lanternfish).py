@@ -3,8 +3,94 @@ https://adventofcode.com/2021/day/6
 
 There are a bunch of lanternfish, each with an internal "timer".
 At every time step, each fish's timer ticks down by 1.  When the timer
-reaches 0, the lanternfish spawns a new fish, and resets its timer to 7.
-The new lanternfish spawns with a timer of 9.
+would go below 0, the lanternfish spawns a new fish, and resets its timer
+to 6.  The new lanternfish spawns with a timer of 8.
 
-How many lanternfish are there are 100 days?
+How many lanternfish are there after 80 days?  (Part 2: after 256 days?)
+
+We don't need to track each fish, just how many fish have each timer
+value: a vector of 9 counts.  Every day, the counts shift down one slot,
+and the fish that were at 0 go to slot 6 and also add that many to slot 8.
 """
+import time
+from collections import deque
+
+import numpy as np
+
+
+def load_counts(path):
+    """Read the comma-separated timers into a 9-slot count vector."""
+    counts = [0] * 9
+    for timer in open(path).read().split(","):
+        counts[int(timer)] += 1
+    return counts
+
+
+def simulate(counts, days):
+    """Step the count vector forward one day at a time: O(days)."""
+    counts = deque(counts)
+    for _ in range(days):
+        # Rotating left moves the spawning fish from slot 0 into slot 8,
+        # which is exactly the new fish; the parents also go to slot 6.
+        counts.rotate(-1)
+        counts[6] += counts[8]
+    return sum(counts)
+
+
+def transition_matrix():
+    """The 9x9 matrix M such that M @ counts is the next day's counts."""
+    M = np.zeros((9, 9), dtype=object)
+    for timer in range(1, 9):
+        M[timer - 1, timer] = 1
+    M[6, 0] = 1
+    M[8, 0] = 1
+    return M
+
+
+def total_weights(days):
+    """
+    Row vector w such that w @ counts is the number of fish after `days`
+    days.  Computed with exact (Python int) matrix powers, so it takes
+    O(log days) matrix multiplications.
+    """
+    return np.ones(9, dtype=object) @ np.linalg.matrix_power(transition_matrix(), days)
+
+
+def simulate_fast(counts, days):
+    """Same as `simulate()`, but in O(log days) steps."""
+    return int(total_weights(days) @ np.array(counts, dtype=object))
+
+
+def simulate_many(populations, days):
+    """
+    Number of fish after `days` days for each of many starting
+    populations at once.  `populations` is a (k, 9) array of count
+    vectors; the matrix power is only computed once for all of them.
+    """
+    return np.asarray(populations, dtype=object) @ total_weights(days)
+
+
+if __name__ == "__main__":
+    counts = load_counts("inputs/2021_day_6")
+    print(simulate(counts, 80), simulate_fast(counts, 80))
+    print(simulate(counts, 256), simulate_fast(counts, 256))
+
+    rng = np.random.default_rng(0)
+    populations = rng.integers(0, 100, size=(10_000, 9))
+    start = time.perf_counter()
+    totals = simulate_many(populations, 256)
+    print(f"10,000 populations, 256 days: {time.perf_counter() - start:.3f}s")
+    print(totals[0] == simulate(populations[0].tolist(), 256))
+
+    for days in (10_000, 100_000):
+        start = time.perf_counter()
+        simulate(counts, days)
+        stepped = time.perf_counter() - start
+        start = time.perf_counter()
+        simulate_fast(counts, days)
+        fast = time.perf_counter() - start
+        print(f"{days:,} days: {stepped:.3f}s stepped, {fast:.3f}s matrix power")
+
+    start = time.perf_counter()
+    simulate_fast(counts, 1_000_000)
+    print(f"1,000,000 days: {time.perf_counter() - start:.3f}s matrix power")
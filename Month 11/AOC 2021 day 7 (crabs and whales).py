@@ -5,39 +5,158 @@ There are a bunch of crabs who need to move along a line.  Given their
 starting positions, what position could they move to that would require
 the least *total distance traveled*, summed up over all the crabs?
 
-Part 2: same thing, but now what point minimizes the sum of the squared distances.
+Part 2: same thing, but now moving n steps costs 1 + 2 + ... + n, i.e.
+n(n+1)/2, rather than n.
+
+Everything below works off a histogram of crab positions (how many crabs
+are at 0, at 1, at 2, ...) rather than the list of positions itself.
+That histogram is only as big as the range of positions, however many
+crabs there are, and it's all the cost calculations need.
 """
 import statistics
+import time
 
-crab_positions = list(map(int, open("inputs/2021_day_7").read().split(",")))
-print(crab_positions)
-
-# find  an integer X such that the total absolute difference between
-# X and all other numbers is minimized.
-smallest_difference = 1_000_000_000_000_000_000_000
-for i in range(min(crab_positions), max(crab_positions) + 1):
-    tad = 0
-    for crab in crab_positions:
-        tad += abs(i - crab)
-    smallest_difference = min(tad, smallest_difference)
-print(smallest_difference)
-
-median_value = statistics.median(crab_positions)
-smallest_difference = sum(abs(median_value - crab) for crab in crab_positions)
-print(smallest_difference)
+import numpy as np
 
 
-# PART 2
 def movement_cost(start, end):
     difference = abs(start - end)
-    difference = difference * (difference + 1)
-    return difference / 2
+    return difference * (difference + 1) // 2
+
+
+def brute_force(crab_positions, cost):
+    """The original O(range * n) double loop.  Only used for checking."""
+    smallest_difference = None
+    for i in range(min(crab_positions), max(crab_positions) + 1):
+        tad = 0
+        for crab in crab_positions:
+            tad += cost(i, crab)
+        if smallest_difference is None or tad < smallest_difference:
+            smallest_difference = tad
+    return smallest_difference
+
+
+def position_counts(crab_positions):
+    """Histogram of (non-negative) positions: counts[x] crabs are at x."""
+    return np.bincount(np.asarray(crab_positions, dtype=np.int64))
+
+
+def stream_position_counts(path, block_size=1 << 24):
+    """
+    Build the position histogram from a comma-separated file without
+    ever holding the whole file (or the list of positions) in memory.
+    """
+    counts = np.zeros(0, dtype=np.int64)
+    leftover = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            data = leftover + block
+            if block:
+                # The last number might continue into the next block.
+                cut = data.rfind(b",") + 1
+                data, leftover = data[:cut], data[cut:]
+            if data.strip(b", \r\n"):
+                values = np.fromstring(data.decode(), dtype=np.int64, sep=",")
+                new = np.bincount(values)
+                if len(new) > len(counts):
+                    new[:len(counts)] += counts
+                    counts = new
+                else:
+                    counts[:len(new)] += new
+            if not block:
+                return counts
+
+
+def _cost_dtype(counts):
+    """int64 if every cost is guaranteed to fit in it, else Python ints."""
+    span = len(counts)
+    worst = int(counts.sum()) * span * (span + 1) // 2
+    return np.int64 if worst < 2**62 else object
+
+
+def all_costs(counts):
+    """
+    Total linear and triangular cost of moving every crab to each
+    position 0..len(counts)-1, in O(range) time using prefix sums.
+
+    With N crabs, C(x) crabs at or left of x, and S(x) the sum of their
+    positions:
+        linear(x)     = x*C(x) - S(x) + (S(end) - S(x)) - x*(N - C(x))
+        triangular(x) = (sum of (x-k)^2  +  linear(x)) / 2
+    and the sum of squares is just N*x^2 - 2*x*sum(k) + sum(k^2).
+    """
+    dtype = _cost_dtype(counts)
+    counts = counts.astype(dtype)
+    x = np.arange(len(counts)).astype(dtype)
+    n = counts.sum()
+    at_or_left = np.cumsum(counts)
+    position_sum = np.cumsum(x * counts)
+    total = position_sum[-1]
+    linear = (
+        x * at_or_left - position_sum
+        + (total - position_sum) - x * (n - at_or_left)
+    )
+    squares = n * x * x - 2 * x * total + (x * x * counts).sum()
+    triangular = (squares + linear) // 2
+    return linear, triangular
+
+
+def solve(counts):
+    """Cheapest (position, cost) for part 1 and for part 2."""
+    linear, triangular = all_costs(counts)
+    best_linear = int(np.argmin(linear))
+    best_triangular = int(np.argmin(triangular))
+    return (
+        (best_linear, int(linear[best_linear])),
+        (best_triangular, int(triangular[best_triangular])),
+    )
+
+
+def cost_at(counts, x, cost):
+    """Exact total cost of moving every crab to x, in O(range)."""
+    distance = np.abs(np.arange(len(counts)) - x)
+    if cost == "linear":
+        per_crab = distance
+    else:
+        per_crab = distance * (distance + 1) // 2
+    return int((per_crab.astype(object) * counts).sum())
+
+
+def solve_shortcut(counts):
+    """
+    Same answers as `solve()`, but only evaluating a couple of positions.
+
+    Part 1's optimum is the median position.  Part 2's cost is within a
+    rounding step of a squared distance, so its optimum is within 1/2 of
+    the mean; we just try the integers on either side.
+    """
+    n = int(counts.sum())
+    median = int(np.searchsorted(np.cumsum(counts), (n + 1) // 2))
+    mean = int((np.arange(len(counts), dtype=object) * counts).sum()) / n
+    candidates = {max(int(np.floor(mean)), 0), min(int(np.ceil(mean)), len(counts) - 1)}
+    part_2 = min((cost_at(counts, x, "triangular"), x) for x in candidates)
+    return (median, cost_at(counts, median, "linear")), (part_2[1], part_2[0])
+
+
+if __name__ == "__main__":
+    crab_positions = list(map(int, open("inputs/2021_day_7").read().split(",")))
+
+    # The original approach, for reference.
+    print(brute_force(crab_positions, lambda i, crab: abs(i - crab)))
+    median_value = statistics.median_low(crab_positions)
+    print(sum(abs(median_value - crab) for crab in crab_positions))
+    print(brute_force(crab_positions, movement_cost))
 
+    counts = stream_position_counts("inputs/2021_day_7")
+    print(solve(counts))
+    print(solve_shortcut(counts))
 
-smallest_difference = 1_000_000_000_000_000_000_000
-for i in range(min(crab_positions), max(crab_positions) + 1):
-    tad = 0
-    for crab in crab_positions:
-        tad += movement_cost(i, crab)
-    smallest_difference = min(tad, smallest_difference)
-print(smallest_difference)
+    # Benchmark: ten million crabs.
+    rng = np.random.default_rng(0)
+    many_crabs = rng.integers(0, 2_000, size=10_000_000)
+    start = time.perf_counter()
+    counts = position_counts(many_crabs)
+    print(solve(counts), f"{time.perf_counter() - start:.3f}s")
+    start = time.perf_counter()
+    print(solve_shortcut(counts), f"{time.perf_counter() - start:.3f}s")
@@ -9,6 +9,7 @@ Part 1: what is the maximum number of calories carried by any one elf?
 
 Part 2: how many calories are carried by the top 3 elves, combined?
 """
+import heapq
 
 
 def calories_per_elf():
@@ -30,11 +31,62 @@ def calories_per_elf_functional():
     return elves
 
 
+def _push_top_k(best, k, value):
+    """Add `value` to the min-heap `best` if it's one of the top `k`."""
+    if len(best) < k:
+        heapq.heappush(best, value)
+    elif best and value > best[0]:
+        heapq.heapreplace(best, value)
+
+
+def top_k_group_sums(path, k, block_size=1 << 24):
+    """
+    The `k` largest group sums in the file, largest first, where groups
+    of numbers (one per line) are separated by blank lines.
+
+    The file is read in `block_size`-byte chunks, and only the `k` best
+    sums so far are kept (in a min-heap, so the smallest of them is the
+    one to beat).  Memory use is O(k + block_size) however big the file is.
+    """
+    if k <= 0:
+        return []
+    best = []
+    current = 0
+    in_group = False
+    leftover = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if block:
+                lines = (leftover + block).split(b"\n")
+                # The last line may continue in the next block.
+                leftover = lines.pop()
+            else:
+                lines, leftover = [leftover], b""
+            for line in lines:
+                if line.strip():
+                    current += int(line)
+                    in_group = True
+                elif in_group:
+                    _push_top_k(best, k, current)
+                    current = 0
+                    in_group = False
+            if not block:
+                break
+    if in_group:
+        _push_top_k(best, k, current)
+    return sorted(best, reverse=True)
+
+
 if __name__ == "__main__":
     calories = calories_per_elf()
     print(max(calories))
     print(sum(sorted(calories)[-3:]))
 
+    top_3 = top_k_group_sums("inputs/2022_day_1", 3)
+    print(top_3[0])
+    print(sum(top_3))
+
     # calories = calories_per_elf_functional()
     # print(max(calories))
     # print(sum(sorted(calories)[-3:]))
@@ -25,99 +25,76 @@ Other player's moves:
     C = scissors
 """
 import itertools
+import time
 
-def check_points(them, me, hypothesis):
+import numpy as np
+
+MOVES = ["rock", "paper", "scissors"]
+
+# SCORE[them, me] is the points for one round, with moves coded as
+# 0 = rock, 1 = paper, 2 = scissors.  (me - them) % 3 is 1 for a win,
+# 0 for a draw, and 2 for a loss.
+SCORE = np.array([
+    [(me + 1) + 3 * ((me - them + 1) % 3) for me in range(3)]
+    for them in range(3)
+])
+
+# Part 2: X/Y/Z mean lose/draw/win, so the move to play is them - 1,
+# them, or them + 1 (mod 3).
+PART_2_SCORE = np.array([
+    [SCORE[them, (them + outcome - 1) % 3] for outcome in range(3)]
+    for them in range(3)
+])
+
+# Each hypothesis maps X/Y/Z (coded 0/1/2) onto a move.
+hypotheses = list(itertools.permutations(range(3)))
+
+
+def read_rounds(path):
     """
-    For a given hypothesis of how X/Y/Z map to rock/paper/scissors,
-    and for an opponent's move, calculate the total points you'd
-    score in that round.
+    Read the rounds straight from the file's bytes into two uint8 code
+    arrays: the opponent's move (A/B/C -> 0/1/2) and the enciphered move
+    (X/Y/Z -> 0/1/2).
+    """
+    raw = np.frombuffer(open(path, "rb").read(), dtype=np.uint8)
+    them = raw[(raw >= ord("A")) & (raw <= ord("C"))] - ord("A")
+    me = raw[(raw >= ord("X")) & (raw <= ord("Z"))] - ord("X")
+    return them, me
+
+
+def score_all(them, me):
+    """
+    Total score under every hypothesis, plus part 2's total.
+
+    There are only 9 different kinds of round, so we count how many
+    there are of each, then dot those counts with a stack of score
+    tables: one per hypothesis, and one for part 2.
     """
-    # Convert the encoded move to "rock", "paper", or "scissors"
-    # depending on the current hypothesis.
-    me = hypothesis.get(me, me)
-
-    # Calculate the points based just on what move I chose
-    total_points = 0
-    move_choice_points = {"rock": 1, "paper": 2, "scissors": 3}
-    total_points += move_choice_points[me]
-
-    # calculate points based on who won
-    match (them, me):
-        case ("rock", "rock"):
-            total_points += 3
-        case ("rock", "paper"):
-            total_points += 6
-        case ("rock", "scissors"):
-            total_points += 0
-        case ("paper", "rock"):
-            total_points += 0
-        case ("paper", "paper"):
-            total_points += 3
-        case ("paper", "scissors"):
-            total_points += 6
-        case ("scissors", "rock"):
-            total_points += 6
-        case ("scissors", "paper"):
-            total_points += 0
-        case ("scissors", "scissors"):
-            total_points += 3
-
-    return total_points
-
-
-moves = open("inputs/2022_day_2").readlines()
-moves = [i.strip().split() for i in moves]
-move_names = {"A": "rock", "B": "paper", "C": "scissors"}
-moves = [(move_names[i], j) for i, j in moves]
-
-hypotheses = [
-    dict(zip(["X", "Y", "Z"], i)) for i in itertools.permutations(["rock", "paper", "scissors"])
-]
-# A Y
-# B X
-# C Z
-test_moves = [
-    ("rock", "paper"),
-    ("paper", "rock"),
-    ("scissors", "scissors")
-]
-print(sum(
-    check_points(i, j, {"X": "rock", "Y": "paper", "Z": "scissors"})
-    for i,j in moves
-))
-
-
-# Part 2
-def check_points_part_2(them, me):
-    total_points = 0
-    match (them, me):
-        case ("rock", "X"):
-            # I play scissors and lose
-            total_points += 3
-        case ("rock", "Y"):
-            # play rock and draw
-            total_points += 4
-        case ("rock", "Z"):
-            # play paper and win
-            total_points += 8
-        case ("paper", "X"):
-            # play rock and lose
-            total_points += 1
-        case ("paper", "Y"):
-            # play paper and draw
-            total_points += 5
-        case ("paper", "Z"):
-            # play scissors and win
-            total_points += 9
-        case ("scissors", "X"):
-            # play paper and lose
-            total_points += 2
-        case ("scissors", "Y"):
-            # scissors and draw
-            total_points += 6
-        case ("scissors", "Z"):
-            # rock and win
-            total_points += 7
-    return total_points
-
-print(sum(check_points_part_2(i, j) for i,j in moves))
+    counts = np.bincount(them.astype(np.intp) * 3 + me, minlength=9).reshape(3, 3)
+    tables = np.stack([SCORE[:, list(h)] for h in hypotheses] + [PART_2_SCORE])
+    totals = np.tensordot(tables, counts, axes=([1, 2], [0, 1]))
+    return totals[:-1], totals[-1]
+
+
+if __name__ == "__main__":
+    them, me = read_rounds("inputs/2022_day_2")
+    hypothesis_totals, part_2 = score_all(them, me)
+    for h, total in zip(hypotheses, hypothesis_totals):
+        print(dict(zip("XYZ", (MOVES[i] for i in h))), total)
+    # Part 1: X = rock, Y = paper, Z = scissors
+    print(hypothesis_totals[hypotheses.index((0, 1, 2))])
+    print(part_2)
+
+    # Benchmark: ten million rounds.
+    rng = np.random.default_rng(0)
+    rounds = np.empty((10_000_000, 4), dtype=np.uint8)
+    rounds[:, 0] = rng.integers(ord("A"), ord("C") + 1, size=len(rounds))
+    rounds[:, 1] = ord(" ")
+    rounds[:, 2] = rng.integers(ord("X"), ord("Z") + 1, size=len(rounds))
+    rounds[:, 3] = ord("\n")
+    start = time.perf_counter()
+    raw = np.frombuffer(rounds.tobytes(), dtype=np.uint8)
+    them = raw[0::4] - ord("A")
+    me = raw[2::4] - ord("X")
+    score_all(them, me)
+    print(f"10,000,000 rounds: {time.perf_counter() - start:.3f}s")
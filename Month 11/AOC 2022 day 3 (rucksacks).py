@@ -9,4 +9,114 @@ Each letter has a score:
 On each line, one letter should appear in both the first and second half
 of the line.  What is the sum of the scores of these letters, summed
 over all lines in the input file?
+
+Each half of a line becomes a 52-bit integer with one bit set per letter
+it contains: bit 0 for "a", bit 1 for "b", ..., bit 51 for "Z".  AND-ing
+the two halves leaves just the shared letter's bit, and since bit k is
+for the letter scoring k + 1, its score is the result's `bit_length()`.
 """
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# BIT[b] is the bit for the letter with byte value b (0 for anything else).
+BIT = [0] * 256
+for score, letter in enumerate(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"):
+    BIT[letter] = 1 << score
+BIT_ARRAY = np.array(BIT, dtype=np.uint64)
+
+
+def item_mask(items):
+    mask = 0
+    for item in items:
+        mask |= BIT[item]
+    return mask
+
+
+def rucksack_priority(line):
+    """Score of the letter shared between the two halves of `line`."""
+    line = line.rstrip()
+    half = len(line) // 2
+    return (item_mask(line[:half]) & item_mask(line[half:])).bit_length()
+
+
+def total_priority(path):
+    """One line at a time, in pure Python."""
+    with open(path, "rb") as f:
+        return sum(rucksack_priority(line) for line in f)
+
+
+def _block_priority(block):
+    """
+    Total score for a block of complete lines.
+
+    Every byte gets mapped to its bit, then `np.bitwise_or.reduceat()`
+    ORs together each run between consecutive offsets in
+    [start_0, middle_0, start_1, middle_1, ...], which gives us each
+    line's left-half mask and right-half mask in one pass.  (The right
+    half's run also covers the line's newline, but that maps to 0.)
+    """
+    newlines = np.flatnonzero(block == ord("\n"))
+    if not len(newlines) or newlines[-1] != len(block) - 1:
+        newlines = np.append(newlines, len(block))
+    starts = np.concatenate(([0], newlines[:-1] + 1))
+    ends = newlines.copy()
+    # Don't count a "\r" before the "\n" as part of the line.
+    has_cr = (ends > starts) & (block[np.maximum(ends - 1, 0)] == ord("\r"))
+    ends[has_cr] -= 1
+    middles = starts + (ends - starts) // 2
+
+    bits = BIT_ARRAY[block]
+    offsets = np.column_stack((starts, middles)).ravel()
+    # reduceat() needs every offset to be a valid index.
+    halves = np.bitwise_or.reduceat(bits, np.minimum(offsets, len(block) - 1))
+    common = halves[0::2] & halves[1::2]
+    # A line too short to have two halves has no shared item.
+    common[middles == starts] = 0
+    # For a power of two 2^k, frexp's exponent is k + 1 (and 0 for 0).
+    return int(np.frexp(common.astype(np.float64))[1].sum())
+
+
+def total_priority_numpy(path, block_size=1 << 22):
+    """
+    Same as `total_priority()`, but vectorized with Numpy.
+
+    The file is memory-mapped and processed `block_size` bytes at a
+    time (cut back to the last full line), so memory use stays fixed
+    however big the file is.
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    total = 0
+    block_start = 0
+    while block_start < len(buf):
+        block = buf[block_start:block_start + block_size]
+        if block_start + len(block) < len(buf):
+            last_newline = np.flatnonzero(block == ord("\n"))
+            if not len(last_newline):
+                raise ValueError("A line is longer than block_size")
+            # Leave the last partial line for the next block.
+            block = block[:last_newline[-1] + 1]
+        total += _block_priority(np.asarray(block))
+        block_start += len(block)
+    return total
+
+
+if __name__ == "__main__":
+    print(total_priority("inputs/2022_day_3"))
+    print(total_priority_numpy("inputs/2022_day_3"))
+
+    # Benchmark on a larger file made of copies of the input.
+    handle, big_file = tempfile.mkstemp()
+    with os.fdopen(handle, "wb") as f:
+        data = open("inputs/2022_day_3", "rb").read()
+        for _ in range(3_000):
+            f.write(data)
+    num_lines = data.count(b"\n") * 3_000
+    for func in (total_priority, total_priority_numpy):
+        start = time.perf_counter()
+        score = func(big_file)
+        elapsed = time.perf_counter() - start
+        print(f"{func.__name__}: {score} in {elapsed:.2f}s ({num_lines / elapsed:,.0f} lines/s)")
+    os.remove(big_file)
@@ -1,20 +1,317 @@
+import math
 import multiprocessing
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
 
 def is_prime(n):
-    if n <= 2:
-        return True
+    """True if `n` is prime, by (deliberately slow) trial division: 0, 1,
+    and negative numbers aren't prime, and 2 is the only even prime.
+    This gives the same answers as the sieve functions below."""
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return n == 2
+    for i in range(3, n // 2 + 1, 2):
+        if n % i == 0:
+            return False
+    return True
+
+def small_primes(up_to):
+    """Plain (non-segmented) Sieve of Eratosthenes.  Returns an array
+    of every prime strictly less than `up_to`."""
+    flags = np.ones(max(up_to, 0), dtype=bool)
+    flags[:2] = False
+    for p in range(2, math.isqrt(max(up_to, 0)) + 1):
+        if flags[p]:
+            flags[p*p::p] = False
+    return np.flatnonzero(flags)
+
+def sieve_segment(start, stop, base_primes=None):
+    """Sieve the half-open range [start, stop).
+
+    Returns a boolean array `flags` where `flags[i]` is True if
+    `start + i` is prime.  `base_primes` must contain every prime
+    up to sqrt(stop); if it's not given, it gets computed here.
+    """
+    if base_primes is None:
+        base_primes = small_primes(math.isqrt(max(stop - 1, 0)) + 1)
+    flags = np.ones(stop - start, dtype=bool)
+    # 0 and 1 aren't prime, but the sieve below won't cross them off.
+    flags[:max(0, min(2, stop) - start)] = False
+    for p in base_primes.tolist():
+        if p * p >= stop:
+            break
+        # First multiple of p inside the segment, but never p itself.
+        first = max(p * p, -(-start // p) * p)
+        flags[first - start::p] = False
+    return flags
+
+# Each worker sieves its own copy of the base primes once, in the pool
+# initializer, rather than having them pickled along with every task.
+_BASE_PRIMES = None
+_BASE_PRIMES_UP_TO = 0
+
+def _init_sieve_worker(up_to):
+    global _BASE_PRIMES, _BASE_PRIMES_UP_TO
+    _BASE_PRIMES = small_primes(math.isqrt(max(up_to - 1, 0)) + 1)
+    _BASE_PRIMES_UP_TO = up_to
+
+def _sieve_task(bounds):
+    start, stop = bounds
+    # Pack 8 flags per byte so there's 1/8th as much to send back.
+    return start, stop, np.packbits(sieve_segment(start, stop, _BASE_PRIMES))
+
+def iter_prime_segments(up_to, segment_size=1 << 20, num_workers=2):
+    """Sieve [1, up_to) in parallel, one segment per task.
+
+    Yields `(start, flags)` pairs in order, where `flags[i]` is True if
+    `start + i` is prime.  At most `2 * num_workers` segments are queued
+    up or waiting to be picked up at once (a new one only gets handed out
+    as each result is taken), so memory use depends on `segment_size`,
+    not `up_to`, even if whatever is using the results is slow.
+    """
+    bounds = (
+        (start, min(start + segment_size, up_to))
+        for start in range(1, up_to, segment_size)
+    )
+    with multiprocessing.Pool(
+        num_workers, initializer=_init_sieve_worker, initargs=(up_to,)
+    ) as P:
+        # Unlike P.imap(), which sends every task off right away and lets
+        # finished results pile up until they're asked for.
+        pending = deque()
+        for task in bounds:
+            pending.append(P.apply_async(_sieve_task, (task,)))
+            if len(pending) < 2 * num_workers:
+                continue
+            start, stop, packed = pending.popleft().get()
+            yield start, np.unpackbits(packed, count=stop - start).view(bool)
+        while pending:
+            start, stop, packed = pending.popleft().get()
+            yield start, np.unpackbits(packed, count=stop - start).view(bool)
+
+def count_primes_parallel(up_to, segment_size=1 << 20, num_workers=2):
+    """Count the primes below `up_to` using the segmented sieve."""
+    return sum(
+        int(np.count_nonzero(flags))
+        for _, flags in iter_prime_segments(up_to, segment_size, num_workers)
+    )
+
+# In shared-memory mode, each worker attaches to the parent's result
+# buffer once and writes its answers straight into it.  The only thing
+# that goes through the pool's pickle channel is a (start, stop) tuple.
+_SHARED_MEMORY = None
+_SHARED_FLAGS = None
+
+def _init_shared_worker(name, up_to, method):
+    global _SHARED_MEMORY, _SHARED_FLAGS
+    _SHARED_MEMORY = shared_memory.SharedMemory(name=name)
+    _SHARED_FLAGS = np.ndarray((up_to,), dtype=bool, buffer=_SHARED_MEMORY.buf)
+    if method == "sieve":
+        _init_sieve_worker(up_to)
+
+def _shared_trial_task(bounds):
+    start, stop = bounds
+    _SHARED_FLAGS[start:stop] = [is_prime(n) for n in range(start, stop)]
+
+def _shared_sieve_task(bounds):
+    start, stop = bounds
+    _SHARED_FLAGS[start:stop] = sieve_segment(start, stop, _BASE_PRIMES)
+
+class SharedFlags(np.ndarray):
+    """A boolean array backed by a `SharedMemory` block.
+
+    The array (and every view or slice of it) holds a reference to the
+    block, so the block can't be closed and unmapped while any of them
+    are still around.  Closing the block out from under an array that
+    points into it would crash the interpreter.
+    """
+
+    def __array_finalize__(self, obj):
+        self._shm = getattr(obj, "_shm", None)
+
+@contextmanager
+def shared_prime_flags(up_to, chunksize=5000, num_workers=2, method="trial"):
+    """Check [1, up_to) for primality, writing into shared memory.
+
+    Yields a boolean array `flags` where `flags[n]` is the result for
+    `n`.  The array is a view of the shared block the workers wrote to,
+    so nothing is copied.  Leaving the `with` block unlinks the block (so
+    no other process can attach to it any more), but the memory itself
+    is only freed once `flags` and any views of it are gone.
+    """
+    if method == "trial":
+        task = _shared_trial_task
+    elif method == "sieve":
+        task = _shared_sieve_task
     else:
-        for i in range(3, n // 2 + 1, 2):
-            if n % i == 0:
-                return True
-    return False
+        raise ValueError(f"Unknown method: {method}")
+
+    shm = shared_memory.SharedMemory(create=True, size=max(up_to, 1))
+    try:
+        flags = SharedFlags((up_to,), dtype=bool, buffer=shm.buf)
+        flags._shm = shm
+        flags[:] = False
+        bounds = (
+            (start, min(start + chunksize, up_to))
+            for start in range(1, up_to, chunksize)
+        )
+        with multiprocessing.Pool(
+            num_workers,
+            initializer=_init_shared_worker,
+            initargs=(shm.name, up_to, method),
+        ) as P:
+            # Results come back through `flags`, not the pool.
+            for _ in P.imap_unordered(task, bounds):
+                pass
+        yield flags
+    finally:
+        # Don't close() the block: that unmaps it even if `flags` is still
+        # in use.  It gets closed when the last array referencing it is
+        # garbage collected.
+        shm.unlink()
+
+def guided_chunks(start, stop, num_workers, cost_exponent=1.0, min_chunk=256,
+                  factor=2):
+    """Split [start, stop) into chunks of decreasing estimated cost.
+
+    The cost of checking `n` is modelled as proportional to
+    `n ** cost_exponent` (1 for trial division, 0 for the sieve).  Each
+    chunk gets `1 / (factor * num_workers)` of the work that's left, so
+    early chunks are big (little overhead) and the last few are small
+    (workers that finish early can pick up the slack at the tail).
+    """
+    k = cost_exponent + 1
+    a = start
+    while a < stop:
+        remaining = stop ** k - a ** k
+        target = remaining / (factor * num_workers)
+        b = math.ceil((a ** k + target) ** (1 / k))
+        b = min(stop, max(b, a + min_chunk))
+        yield a, b
+        a = b
+
+def _timed_task(method, start, stop, up_to):
+    began = time.perf_counter()
+    if method == "sieve":
+        if _BASE_PRIMES_UP_TO < up_to:
+            # joblib workers don't get an initializer (and get reused
+            # between calls), so set up the base primes lazily.
+            _init_sieve_worker(up_to)
+        flags = sieve_segment(start, stop, _BASE_PRIMES)
+    else:
+        flags = np.array([is_prime(n) for n in range(start, stop)], dtype=bool)
+    finished = time.perf_counter()
+    return os.getpid(), finished - began, start, stop, np.packbits(flags)
+
+def _timed_task_star(args):
+    return _timed_task(*args)
+
+def is_prime_scheduled(up_to, num_workers=None, method="trial",
+                       backend="multiprocessing", min_chunk=256):
+    """Check [1, up_to) for primality with cost-balanced chunks.
+
+    No chunk size tuning needed: the range gets split up by
+    `guided_chunks()`, and each worker pulls the next chunk as soon as
+    it's done with its last one.  `num_workers` defaults to
+    `os.cpu_count()`.  `backend` is either "multiprocessing" or "joblib".
+
+    Returns `(flags, report)`.  `flags[i]` is the result for `i + 1`.
+    `report` has the total wall time, and each worker's busy time,
+    idle time, and number of tasks and numbers processed.
+    """
+    if method not in ("trial", "sieve"):
+        raise ValueError(f"Unknown method: {method}")
+    num_workers = num_workers or os.cpu_count() or 1
+    cost_exponent = 1.0 if method == "trial" else 0.0
+    chunks = list(guided_chunks(1, up_to, num_workers, cost_exponent, min_chunk))
+    tasks = [(method, start, stop, up_to) for start, stop in chunks]
+
+    began = time.perf_counter()
+    if backend == "multiprocessing":
+        initializer = _init_sieve_worker if method == "sieve" else None
+        initargs = (up_to,) if method == "sieve" else ()
+        with multiprocessing.Pool(num_workers, initializer, initargs) as P:
+            results = list(P.imap_unordered(_timed_task_star, tasks))
+    elif backend == "joblib":
+        from joblib import Parallel, delayed
+
+        # The chunks are already sized; don't let joblib re-batch them.
+        results = Parallel(n_jobs=num_workers, batch_size=1)(
+            delayed(_timed_task)(*task) for task in tasks
+        )
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    wall = time.perf_counter() - began
+
+    flags = np.zeros(max(up_to - 1, 0), dtype=bool)
+    workers = {}
+    for pid, busy, start, stop, packed in results:
+        flags[start - 1:stop - 1] = np.unpackbits(packed, count=stop - start)
+        stats = workers.setdefault(pid, {"busy": 0.0, "tasks": 0, "numbers": 0})
+        stats["busy"] += busy
+        stats["tasks"] += 1
+        stats["numbers"] += stop - start
+    for stats in workers.values():
+        stats["idle"] = max(wall - stats["busy"], 0.0)
+
+    report = {
+        "wall": wall,
+        "num_workers": num_workers,
+        "num_chunks": len(chunks),
+        "workers": workers,
+    }
+    return flags, report
+
+def is_prime_parallel(up_to, chunksize=1, num_workers=None, method="trial",
+                      segment_size=1 << 20, shared=False):
+    """Check every number in [1, up_to) for primality in parallel.
+
+    `method="trial"` sends each number to the workers individually and
+    returns a list of results, in whatever order they finished in.
+    `method="sieve"` has each worker sieve a contiguous segment instead,
+    and returns a boolean array where entry `i` is for the number `i + 1`.
+    Either way, a number is prime by the usual definition (see
+    `is_prime()`): 1 isn't, 2 is.
+
+    With `shared=True`, workers write into a shared-memory buffer rather
+    than sending results back, and the results always come back as an
+    in-order boolean array like `method="sieve"`.  `chunksize` (or
+    `segment_size` for the sieve) is how many numbers go in each task.
+
+    `chunksize="auto"` hands the work off to `is_prime_scheduled()`, and
+    also returns an in-order boolean array.  `num_workers` defaults to
+    `os.cpu_count()` there, and to 2 otherwise.
+    """
+    if chunksize == "auto":
+        return is_prime_scheduled(up_to, num_workers, method)[0]
+    num_workers = num_workers or 2
+
+    if shared:
+        size = segment_size if method == "sieve" else chunksize
+        with shared_prime_flags(up_to, size, num_workers, method) as flags:
+            # One copy at the very end, so the shared block can be freed.
+            return np.array(flags[1:])
+
+    if method == "sieve":
+        # Fill in one preallocated array, rather than keeping every segment
+        # around and concatenating them (which needs twice the memory).
+        result = np.zeros(max(up_to - 1, 0), dtype=bool)
+        for start, flags in iter_prime_segments(up_to, segment_size, num_workers):
+            result[start - 1:start - 1 + len(flags)] = flags
+        return result
+    elif method != "trial":
+        raise ValueError(f"Unknown method: {method}")
 
-def is_prime_parallel(up_to, chunksize=1, num_workers=2):
-    """Parallelize the Collatz length calculation."""
     with multiprocessing.Pool(num_workers) as P:
         lengths = P.imap_unordered(
-            is_prime, 
+            is_prime,
             list(range(1, up_to)),
             chunksize=chunksize
         )
-        return list(lengths)
\ No newline at end of file
+        return list(lengths)
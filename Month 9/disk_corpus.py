@@ -0,0 +1,218 @@
+"""
+A disk-backed, memory-mapped corpus for training Gensim models.
+
+Gensim's models make several passes over the corpus, so the notebooks
+used to keep the whole thing in memory as a list of lists of strings
+(or of bag-of-words tuples).  For the full Amazon reviews dump, that's
+many GB of Python objects.
+
+Instead, a corpus gets written to a folder once, as:
+
+    vocab.txt    - one token per line; line i is token id i.
+    ids.bin      - every document's token ids, end to end, as int32.
+    offsets.bin  - document i is ids[offsets[i]:offsets[i + 1]], as int64.
+
+`DiskCorpus` memory-maps those files.  Iterating over it reads one
+document at a time, so memory use stays flat however big the corpus
+is, and the operating system takes care of caching the file between
+passes.
+
+The files are written to a temporary folder that only gets renamed to
+its real name once everything is written, so checking whether the
+folder exists is enough to tell whether a corpus has been saved: an
+interrupted run never leaves a half-written one behind.
+"""
+import os
+import shutil
+
+import numpy as np
+from tqdm.auto import tqdm
+
+from text_preprocessing import iter_preprocessed
+
+
+def _paths(path):
+    return (
+        os.path.join(path, "vocab.txt"),
+        os.path.join(path, "ids.bin"),
+        os.path.join(path, "offsets.bin"),
+    )
+
+
+def _write_vocab(path, vocab):
+    with open(_paths(path)[0], "w", encoding="utf-8") as f:
+        for token in vocab:
+            f.write(f"{token}\n")
+
+
+def _start_writing(path):
+    """Make (and return) an empty temporary folder to write `path` into."""
+    tmp_path = os.path.normpath(path) + ".partial"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    return tmp_path
+
+
+def _finish_writing(tmp_path, path):
+    """Move the finished corpus in `tmp_path` to `path`, replacing any
+    corpus that was already there."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+def write_corpus(path, stream):
+    """Save a `TokenStream` (from `text_preprocessing`) to the folder `path`."""
+    tmp_path = _start_writing(path)
+    _, ids_path, offsets_path = _paths(tmp_path)
+    _write_vocab(tmp_path, stream.vocab)
+    stream.token_ids.astype(np.int32).tofile(ids_path)
+    np.asarray(stream.offsets, dtype=np.int64).tofile(offsets_path)
+    _finish_writing(tmp_path, path)
+    return DiskCorpus(path)
+
+
+def preprocess_to_disk(texts, path, **kwargs):
+    """
+    Preprocess `texts` (see `text_preprocessing.iter_preprocessed()`) and
+    write the results to the folder `path` chunk by chunk, so the whole
+    preprocessed corpus never has to fit in memory.
+    """
+    tmp_path = _start_writing(path)
+    _, ids_path, offsets_path = _paths(tmp_path)
+    vocab_index = {}
+    end = 0
+    with open(ids_path, "wb") as ids_file, open(offsets_path, "wb") as offsets_file:
+        np.zeros(1, dtype=np.int64).tofile(offsets_file)
+        for ids, lengths in iter_preprocessed(texts, vocab_index, **kwargs):
+            ids.astype(np.int32).tofile(ids_file)
+            offsets = end + np.cumsum(lengths)
+            offsets.tofile(offsets_file)
+            if len(offsets):
+                end = int(offsets[-1])
+    _write_vocab(tmp_path, vocab_index)
+    _finish_writing(tmp_path, path)
+    return DiskCorpus(path)
+
+
+def _map(path, dtype):
+    # np.memmap() refuses to map an empty file.
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class DiskCorpus:
+    """
+    A corpus saved by `write_corpus()` or `preprocess_to_disk()`.
+
+    Iterating gives each document as a list of token strings, which is
+    what `Dictionary()` and `Word2Vec()` want.  For `LdaModel()` and
+    `LdaMulticore()`, use `.bow(dictionary)` to get a bag-of-words view.
+
+    `docs` optionally picks out which documents (and in what order) this
+    corpus covers; `subset()` and `shards()` use it to make cheap views
+    of the same files.  With `progress=True`, each pass over the corpus
+    gets a progress bar.
+    """
+
+    def __init__(self, path, docs=None, progress=False):
+        vocab_path, ids_path, offsets_path = _paths(path)
+        self.path = path
+        with open(vocab_path, encoding="utf-8") as f:
+            self.vocab = f.read().split("\n")[:-1]
+        self.token_ids = _map(ids_path, np.int32)
+        self.offsets = _map(offsets_path, np.int64)
+        self.docs = np.arange(len(self.offsets) - 1) if docs is None else np.asarray(docs)
+        self.progress = progress
+        self.n_passes = 1
+
+    def __len__(self):
+        return len(self.docs)
+
+    def ids(self, i):
+        """Document `i` (counting from 0 within this corpus) as an array of
+        token ids.  This is a view into the memory map, not a copy."""
+        doc = self.docs[i]
+        return self.token_ids[self.offsets[doc]:self.offsets[doc + 1]]
+
+    def __getitem__(self, i):
+        vocab = self.vocab
+        return [vocab[t] for t in self.ids(i)]
+
+    def lengths(self):
+        """Number of tokens in each document."""
+        return self.offsets[self.docs + 1] - self.offsets[self.docs]
+
+    def _view(self, docs):
+        view = DiskCorpus.__new__(DiskCorpus)
+        view.__dict__.update(self.__dict__)
+        view.docs = docs
+        view.n_passes = 1
+        return view
+
+    def subset(self, docs):
+        """A corpus of just the documents `docs` (indices into this one)."""
+        return self._view(self.docs[docs])
+
+    def shards(self, num_shards):
+        """Split the corpus into `num_shards` contiguous pieces, e.g. to give
+        each of several worker processes its own part to iterate over."""
+        return [self._view(docs) for docs in np.array_split(self.docs, num_shards)]
+
+    def iter_ids(self):
+        """Iterate over the documents as arrays of token ids."""
+        docs = self.docs
+        if self.progress:
+            docs = tqdm(docs, desc=f"Pass {self.n_passes}", unit_scale=True, smoothing=0)
+        token_ids, offsets = self.token_ids, self.offsets
+        for doc in docs:
+            yield token_ids[offsets[doc]:offsets[doc + 1]]
+        self.n_passes += 1
+
+    def __iter__(self):
+        vocab = self.vocab
+        for ids in self.iter_ids():
+            yield [vocab[t] for t in ids]
+
+    def bow(self, dictionary, min_terms=0):
+        """This corpus in bag-of-words format for `dictionary` (a Gensim
+        `Dictionary`), keeping only documents with at least `min_terms`
+        distinct words in the dictionary."""
+        return BowCorpus(self, dictionary, min_terms)
+
+
+class BowCorpus:
+    """A bag-of-words view of a `DiskCorpus`: see `DiskCorpus.bow()`."""
+
+    def __init__(self, corpus, dictionary, min_terms=0):
+        # Our token ids -> the dictionary's ids (-1 for words it dropped).
+        token2id = dictionary.token2id
+        self.remap = np.array([token2id.get(t, -1) for t in corpus.vocab], dtype=np.int32)
+        if min_terms:
+            keep = [
+                i for i, ids in enumerate(corpus.iter_ids())
+                if len(np.unique(self._known(ids))) >= min_terms
+            ]
+            corpus = corpus.subset(np.array(keep, dtype=np.int64))
+        self.corpus = corpus
+
+    def _known(self, ids):
+        ids = self.remap[ids]
+        return ids[ids >= 0]
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def __iter__(self):
+        for ids in self.corpus.iter_ids():
+            terms, counts = np.unique(self._known(ids), return_counts=True)
+            yield list(zip(terms.tolist(), counts.tolist()))
+
+    @property
+    def progress(self):
+        return self.corpus.progress
+
+    @progress.setter
+    def progress(self, value):
+        self.corpus.progress = value
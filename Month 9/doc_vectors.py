@@ -0,0 +1,155 @@
+"""
+Turn whole corpora into document vectors using trained word vectors.
+
+The word-by-word way of doing this looks up each token in `w2v.wv`,
+stacks the vectors into a new array (plus a new `np.zeros()` for every
+unknown word), and sums them, for one document at a time.  Instead:
+
+1. Map every token in a batch of documents to its row in the embedding
+   matrix, all at once, dropping unknown words.  That gives the usual
+   CSR sparse matrix arrays: `indptr` (where each document starts) and
+   `indices` (the embedding rows).
+2. Put a weight on each token (1 to sum the vectors, 1/length to average
+   them, or TF-IDF weights), making a sparse documents x vocabulary
+   matrix.
+3. Multiply that by the embedding matrix.  One sparse matrix product
+   gives every document's vector in the batch.
+
+Batches are `chunk_size` documents, so only one batch's worth of
+vectors needs to be in memory at a time (see `iter_document_vectors()`,
+and the `out` option of `document_vectors()`).
+"""
+import numpy as np
+import scipy.sparse
+from tqdm.auto import tqdm
+
+POOLING = ("sum", "mean", "tfidf")
+
+
+def _token_rows(corpus, key_to_index):
+    """A function mapping a chunk of `corpus`'s documents to CSR-style
+    `(indptr, indices)`, with indices as rows of the embedding matrix."""
+    if hasattr(corpus, "token_ids"):
+        # A DiskCorpus or TokenStream: translate its vocabulary once, then
+        # every chunk is just array indexing.
+        remap = np.array([key_to_index.get(t, -1) for t in corpus.vocab], dtype=np.int64)
+        offsets = np.asarray(corpus.offsets)
+        docs = getattr(corpus, "docs", None)
+
+        def rows(start, stop):
+            chunk = np.arange(start, stop) if docs is None else docs[start:stop]
+            starts = offsets[chunk]
+            lengths = offsets[chunk + 1] - starts
+            # Position of every token in the chunk, in the token id array.
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            positions += np.arange(len(positions))
+            return _drop_unknown(lengths, remap[corpus.token_ids[positions]])
+    else:
+        # Anything else: a sequence of lists of tokens.
+        def rows(start, stop):
+            chunk = corpus[start:stop]
+            lengths = np.array([len(doc) for doc in chunk], dtype=np.int64)
+            indices = np.array(
+                [key_to_index.get(t, -1) for doc in chunk for t in doc], dtype=np.int64
+            )
+            return _drop_unknown(lengths, indices)
+
+    return rows
+
+
+def _drop_unknown(lengths, indices):
+    known = indices >= 0
+    doc_of_token = np.repeat(np.arange(len(lengths)), lengths)
+    kept = np.bincount(doc_of_token[known], minlength=len(lengths))
+    indptr = np.concatenate(([0], np.cumsum(kept)))
+    return indptr, indices[known]
+
+
+def _chunk_ranges(n, chunk_size):
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+
+def idf_weights(corpus, wv, chunk_size=10_000):
+    """
+    Inverse document frequency of every word in `wv`, over `corpus`, using
+    the same smoothed formula as scikit-learn's `TfidfVectorizer`:
+    log((1 + n) / (1 + df)) + 1.
+    """
+    rows = _token_rows(corpus, wv.key_to_index)
+    df = np.zeros(len(wv.index_to_key), dtype=np.int64)
+    for start, stop in _chunk_ranges(len(corpus), chunk_size):
+        indptr, indices = rows(start, stop)
+        matrix = scipy.sparse.csr_matrix(
+            (np.ones(len(indices)), indices, indptr),
+            shape=(stop - start, len(df)),
+        )
+        matrix.sum_duplicates()
+        df += np.bincount(matrix.indices, minlength=len(df))
+    return np.log((1 + len(corpus)) / (1 + df)) + 1
+
+
+def iter_document_vectors(corpus, wv, pooling="mean", chunk_size=10_000, idf=None):
+    """
+    Yield document vectors for `corpus`, `chunk_size` documents at a time,
+    as float32 arrays.
+
+    `corpus` is a `DiskCorpus`, a `TokenStream`, or a list of lists of
+    tokens.  `wv` is a trained model's `KeyedVectors` (e.g. `w2v.wv`).
+    `pooling` is how to combine each document's word vectors:
+
+        "sum"   - add them up.
+        "mean"  - average them.
+        "tfidf" - average them, weighted by TF-IDF.
+
+    Words that aren't in `wv` are skipped, and a document with no known
+    words gets all zeros.  For "tfidf", `idf` can be passed in (from
+    `idf_weights()`); otherwise it's computed first, with an extra pass
+    over the corpus.
+    """
+    if pooling not in POOLING:
+        raise ValueError(f"pooling must be one of {POOLING}, not {pooling!r}")
+    if pooling == "tfidf" and idf is None:
+        idf = idf_weights(corpus, wv, chunk_size)
+    rows = _token_rows(corpus, wv.key_to_index)
+    embeddings = wv.vectors
+    for start, stop in _chunk_ranges(len(corpus), chunk_size):
+        indptr, indices = rows(start, stop)
+        if pooling == "sum":
+            weights = np.ones(len(indices), dtype=np.float32)
+        else:
+            weights = np.ones(len(indices)) if pooling == "mean" else idf[indices]
+            # Divide each token's weight by its document's total weight.
+            doc_of_token = np.repeat(np.arange(stop - start), np.diff(indptr))
+            totals = np.bincount(doc_of_token, weights, minlength=stop - start)
+            weights = (weights / totals[doc_of_token]).astype(np.float32)
+        matrix = scipy.sparse.csr_matrix(
+            (weights, indices, indptr), shape=(stop - start, len(embeddings))
+        )
+        yield np.asarray(matrix @ embeddings, dtype=np.float32)
+
+
+def document_vectors(corpus, wv, pooling="mean", chunk_size=10_000, out=None, progress=True):
+    """
+    Vectors for every document in `corpus`, as a (documents x vector size)
+    array.  See `iter_document_vectors()` for the arguments.
+
+    If `out` is a file name, the vectors are written there (as a `.npy`
+    file) a chunk at a time, and a read-only memory map of them is
+    returned, so they never all need to fit in memory.
+    """
+    shape = (len(corpus), wv.vector_size)
+    if out is None:
+        vectors = np.zeros(shape, dtype=np.float32)
+    else:
+        vectors = np.lib.format.open_memmap(out, mode="w+", dtype=np.float32, shape=shape)
+    start = 0
+    with tqdm(total=len(corpus), desc="Vectorizing", unit_scale=True, disable=not progress) as bar:
+        for chunk in iter_document_vectors(corpus, wv, pooling, chunk_size):
+            vectors[start:start + len(chunk)] = chunk
+            start += len(chunk)
+            bar.update(len(chunk))
+    if out is None:
+        return vectors
+    vectors.flush()
+    del vectors
+    return np.load(out, mmap_mode="r")
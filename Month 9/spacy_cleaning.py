@@ -0,0 +1,142 @@
+"""
+Clean up texts with spaCy, without keeping every `Doc` in memory, and
+without re-parsing texts we've already parsed.
+
+`spacy_clean()` does what the notebook's first version did--keep the
+lemmas (or lowercased text) of every token that isn't a stopword,
+punctuation, or whitespace--but:
+
+- Each `Doc` is filtered down to a string as soon as `nlp.pipe()`
+  produces it, and then thrown away, rather than building a list of all
+  of the `Doc`s first.
+- The cleaned strings are saved in a small SQLite database, keyed on a
+  hash of the text plus the spaCy model and settings used.  Cleaning the
+  same texts again only parses the ones that are new, changed, or cleaned
+  with different settings; everything else comes straight out of the
+  cache.  (Pass `cache_path=None` when timing the parsing itself.)
+"""
+import hashlib
+import itertools
+import sqlite3
+
+from tqdm.auto import tqdm
+
+
+def clean_doc(doc, attr="lemma_"):
+    """Join `attr` (e.g. "lemma_" or "lower_") of the tokens in `doc` that
+    aren't stopwords, whitespace, or punctuation."""
+    return " ".join(
+        getattr(tok, attr)
+        for tok in doc
+        if not (
+            tok.is_stop
+            or tok.is_space
+            or tok.is_punct
+        )
+    )
+
+
+def _settings_key(nlp, attr, tokenize_only):
+    """Everything besides the text itself that changes the cleaned output."""
+    meta = nlp.meta
+    pipes = [] if tokenize_only else nlp.pipe_names
+    return repr((meta.get("lang"), meta.get("name"), meta.get("version"), pipes, attr))
+
+
+class CleanedTextCache:
+    """An on-disk mapping of hash keys to cleaned texts."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS cleaned (key TEXT PRIMARY KEY, text TEXT) WITHOUT ROWID"
+        )
+
+    def get_many(self, keys, batch_size=500):
+        """{key: cleaned text} for whichever of `keys` are in the cache."""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            found.update(self.db.execute(
+                f"SELECT key, text FROM cleaned WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ))
+        return found
+
+    def put_many(self, items):
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO cleaned VALUES (?, ?)", items)
+
+    def close(self):
+        self.db.close()
+
+
+def iter_spacy_clean(nlp, texts, attr="lemma_", tokenize_only=False, n_process=1, batch_size=1000):
+    """
+    Yield `clean_doc()` for each text in `texts`, in order.  Only one batch
+    of `Doc`s is alive at a time.
+
+    With `tokenize_only=True`, only spaCy's tokenizer gets run (like
+    `nlp.make_doc()`): much faster, but no lemmas, so use attr="lower_".
+    """
+    if tokenize_only:
+        docs = nlp.tokenizer.pipe(texts, batch_size=batch_size)
+    else:
+        docs = nlp.pipe(texts, n_process=n_process, batch_size=batch_size)
+    for doc in docs:
+        yield clean_doc(doc, attr)
+
+
+def spacy_clean(
+    nlp,
+    texts,
+    attr="lemma_",
+    tokenize_only=False,
+    n_process=1,
+    batch_size=1000,
+    cache_path="spacy_cleaned.sqlite",
+):
+    """
+    Return a list of the cleaned version of each of `texts` (see
+    `iter_spacy_clean()` for the arguments), using the cache in
+    `cache_path` for any texts it's already seen.  Set `cache_path` to
+    None to not use a cache.
+    """
+    texts = list(texts)
+    if cache_path is None:
+        return list(tqdm(
+            iter_spacy_clean(nlp, texts, attr, tokenize_only, n_process, batch_size),
+            total=len(texts),
+            desc="spaCy cleaning",
+            smoothing=0.01,
+        ))
+
+    settings = _settings_key(nlp, attr, tokenize_only)
+    keys = [
+        hashlib.sha256(f"{settings}\0{text}".encode("utf-8", "surrogatepass")).hexdigest()
+        for text in texts
+    ]
+    cache = CleanedTextCache(cache_path)
+    try:
+        found = cache.get_many(set(keys))
+
+        # Parse each text that isn't cached yet (just once, if there are
+        # duplicates), saving the results a batch at a time.
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        cleaned = iter_spacy_clean(nlp, missing.values(), attr, tokenize_only, n_process, batch_size)
+        progress = tqdm(
+            zip(missing, cleaned),
+            total=len(missing),
+            desc=f"spaCy cleaning ({len(found):,} cached)",
+            smoothing=0.01,
+        )
+        while batch := list(itertools.islice(progress, batch_size)):
+            cache.put_many(batch)
+            found.update(batch)
+    finally:
+        cache.close()
+    return [found[key] for key in keys]
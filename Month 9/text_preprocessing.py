@@ -0,0 +1,163 @@
+"""
+Fast, parallel text preprocessing for the Gensim notebooks.
+
+This does the same thing as the notebooks' `preprocess()` function:
+
+    s = preprocessing.strip_punctuation(s)
+    s = preprocessing.strip_numeric(s)
+    s = preprocessing.remove_stopwords(s.lower())
+    s = preprocessing.strip_short(s)
+    s = preprocessing.stem_text(s)
+    return s.split()
+
+but a lot faster, on a lot of documents:
+
+- Each of those Gensim functions re-scans (and re-builds) the whole
+  string.  Here, punctuation and digits are handled by a single
+  `str.translate()` call, and the stopword and length checks happen in
+  the same loop over the tokens.
+- The Porter stemmer is slow, but the same few thousand words come up
+  over and over, so stems are memoized (in a bounded LRU cache, one per
+  worker process).
+- Documents are sent to the worker processes in big chunks, rather than
+  one joblib task per document.
+- The output is a `TokenStream`: a vocabulary, plus one flat array of
+  token ids for the whole corpus.  That's a tiny fraction of the memory
+  that millions of lists of Python strings would take.
+"""
+import functools
+import itertools
+import multiprocessing
+import os
+import string
+
+import numpy as np
+from gensim.parsing.porter import PorterStemmer
+from gensim.parsing.preprocessing import STOPWORDS
+from tqdm.auto import tqdm
+
+# Punctuation becomes a space (like strip_punctuation()), and digits are
+# deleted outright (like strip_numeric()).
+_TRANSLATION = str.maketrans(
+    {**{c: " " for c in string.punctuation}, **{c: None for c in string.digits}}
+)
+
+# One stemmer, and one cache of its results, per process.
+_stemmer = PorterStemmer()
+
+
+@functools.lru_cache(maxsize=100_000)
+def stem(word):
+    return _stemmer.stem(word)
+
+
+def preprocess(s, min_length=3):
+    """Clean up one document, returning a list of tokens."""
+    return [
+        stem(word)
+        for word in s.translate(_TRANSLATION).lower().split()
+        if len(word) >= min_length and word not in STOPWORDS
+    ]
+
+
+def _preprocess_chunk(texts):
+    """
+    Preprocess a list of documents, returning `(vocab, token_ids, lengths)`:
+    the distinct tokens in this chunk, each token as an index into
+    `vocab`, and the number of tokens in each document.
+    """
+    vocab = {}
+    token_ids = []
+    lengths = []
+    for text in texts:
+        tokens = preprocess(text)
+        token_ids.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+        lengths.append(len(tokens))
+    return (
+        list(vocab),
+        np.array(token_ids, dtype=np.int32),
+        np.array(lengths, dtype=np.int64),
+    )
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class TokenStream:
+    """
+    A whole preprocessed corpus, stored compactly.
+
+    Document `i`'s tokens are `token_ids[offsets[i]:offsets[i + 1]]`, as
+    indices into `vocab`.  Indexing or iterating gives lists of token
+    strings, like the notebooks' `preprocess()` did, so this can go
+    straight into Gensim's `Dictionary()` and friends.
+    """
+
+    def __init__(self, vocab, token_ids, offsets):
+        self.vocab = vocab
+        self.token_ids = token_ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def ids(self, i):
+        """Document `i` as an array of token ids."""
+        return self.token_ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def lengths(self):
+        """Number of tokens in each document."""
+        return np.diff(self.offsets)
+
+    def __getitem__(self, i):
+        return [self.vocab[t] for t in self.ids(i)]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def iter_preprocessed(texts, vocab_index, num_workers=None, chunk_size=10_000, progress=True):
+    """
+    Preprocess every document in `texts` (any iterable of strings), in
+    `num_workers` processes (default: all CPUs), `chunk_size` documents
+    at a time.  Yields `(token_ids, lengths)` for each chunk, in order.
+
+    Each chunk comes back from its worker with its own small vocabulary.
+    Those get merged into `vocab_index` (a dict of token -> id, which is
+    updated in place) as the chunks arrive, and `token_ids` are ids in
+    that merged vocabulary.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    with multiprocessing.Pool(num_workers) as P, tqdm(
+        desc="Preprocessing",
+        total=len(texts) if hasattr(texts, "__len__") else None,
+        unit_scale=True,
+        disable=not progress,
+    ) as bar:
+        for vocab, ids, lengths in P.imap(_preprocess_chunk, _chunks(texts, chunk_size)):
+            # Translate this chunk's token ids into the global ones.
+            remap = np.array(
+                [vocab_index.setdefault(t, len(vocab_index)) for t in vocab],
+                dtype=np.int32,
+            )
+            yield (remap[ids] if len(ids) else ids), lengths
+            bar.update(len(lengths))
+
+
+def preprocess_texts(texts, num_workers=None, chunk_size=10_000, progress=True):
+    """
+    Preprocess every document in `texts` (see `iter_preprocessed()`).
+    Returns a `TokenStream`, with documents in the same order as `texts`.
+    """
+    vocab_index = {}
+    all_ids = [np.zeros(0, dtype=np.int32)]
+    all_lengths = [np.zeros(1, dtype=np.int64)]
+    for ids, lengths in iter_preprocessed(texts, vocab_index, num_workers, chunk_size, progress):
+        all_ids.append(ids)
+        all_lengths.append(lengths)
+    offsets = np.cumsum(np.concatenate(all_lengths))
+    return TokenStream(list(vocab_index), np.concatenate(all_ids), offsets)